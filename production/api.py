@@ -45,6 +45,7 @@ from reliability.retry_handler import retry, RetryExhausted, AsyncRetryHandler
 from reliability.health_checks import (
     health_monitor,
     initialize_health_checks,
+    shutdown_health_checks,
     SystemResourceCheck,
     GPUHealthCheck
 )
@@ -246,6 +247,7 @@ async def startup_event():
     
     # Check dependencies status
     if cache_manager.enabled:
+        await cache_manager.start_write_behind()
         logger.info("✅ Redis connected - caching enabled")
     else:
         logger.warning("⚠️  Redis unavailable - caching disabled")
@@ -268,6 +270,9 @@ async def shutdown_event():
     if translator:
         await translator.cleanup()
     
+    await cache_manager.stop_write_behind()
+    shutdown_health_checks()
+    
     logger.info("✅ API shutdown complete")
 
 
@@ -380,7 +385,10 @@ async def ensure_models_loaded():
                 source_language=os.getenv("SOURCE_LANGUAGE", "ko"),
                 target_language=os.getenv("TARGET_LANGUAGE", "eng_Latn"),
                 whisper_model=os.getenv("WHISPER_MODEL", "base"),
-                max_workers=int(os.getenv("MAX_WORKERS", "2"))
+                max_workers=int(os.getenv("MAX_WORKERS", "2")),
+                num_beams=int(os.getenv("NUM_BEAMS", "2")),
+                backend=os.getenv("TRANSLATOR_BACKEND", "hf"),
+                compile_models=os.getenv("COMPILE_MODELS", "false").lower() == "true"
             )
             
             await new_translator.load_models()
@@ -467,6 +475,19 @@ async def simple_health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
 
+@app.get("/health/live", tags=["Monitoring"])
+async def liveness_check():
+    """
+    Liveness probe
+    
+    Runs only the cheap checks and returns on the first unhealthy result,
+    skipping the model inference probe.
+    """
+    liveness = await health_monitor.run_liveness()
+    status_code = 503 if liveness["overall_status"] == "unhealthy" else 200
+    return JSONResponse(content=liveness, status_code=status_code)
+
+
 @app.get("/metrics", tags=["Monitoring"])
 async def get_metrics():
     """
@@ -498,7 +519,7 @@ async def create_api_key(
     - enterprise: 1000 req/min, 1M/day
     """
     try:
-        api_key = APIKeyManager.generate_api_key(user_id, tier)
+        api_key = await APIKeyManager.generate_api_key_async(user_id, tier)
         limits = get_rate_limit(tier)
         
         return {
@@ -537,7 +558,7 @@ async def rotate_api_key_endpoint(
     
     try:
         # Rotate key
-        new_key = APIKeyManager.rotate_api_key(old_key)
+        new_key = await APIKeyManager.rotate_api_key_async(old_key)
         
         return {
             "message": "API key rotated successfully",
@@ -614,11 +635,13 @@ async def translate_text_endpoint(
     tier = user.get("tier", "free")
     limits = get_rate_limit(tier)
     
-    allowed, info = rate_limiter.check_rate_limit(
+    # Per-minute and per-day limits in one Redis call
+    (allowed, info), (daily_allowed, daily_info) = await rate_limiter.check_all_limits(
         request,
         user,
         max_requests=limits["requests_per_minute"],
-        window_seconds=60
+        window_seconds=60,
+        max_daily=limits["requests_per_day"]
     )
     
     if not allowed:
@@ -633,6 +656,18 @@ async def translate_text_endpoint(
             }
         )
     
+    if not daily_allowed:
+        MetricsHelper.record_rate_limit_exceeded(tier)
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "error": "Daily limit exceeded",
+                "limit": daily_info["limit"],
+                "remaining": daily_info["remaining"],
+                "reset_date": daily_info["reset_date"]
+            }
+        )
+    
     # Check cache
     cached = translation_cache.get_translation(
         text=translation_request.text,
@@ -725,16 +760,21 @@ async def transcribe_audio_endpoint(
     tier = user.get("tier", "free")
     limits = get_rate_limit(tier)
     
-    allowed, info = rate_limiter.check_rate_limit(
+    # Per-minute and per-day limits in one Redis call
+    (allowed, _), (daily_allowed, _) = await rate_limiter.check_all_limits(
         request,
         user,
         max_requests=limits["requests_per_minute"],
-        window_seconds=60
+        window_seconds=60,
+        max_daily=limits["requests_per_day"]
     )
     
     if not allowed:
         raise HTTPException(status_code=429, detail="Rate limit exceeded")
     
+    if not daily_allowed:
+        raise HTTPException(status_code=429, detail="Daily limit exceeded")
+    
     # Validate input
     InputValidator.validate_language_code(source_language, "source_language")
     InputValidator.validate_language_code(target_language, "target_language")
@@ -967,7 +1007,7 @@ async def bootstrap_admin_key(
     
     try:
         # Create admin API key
-        api_key = APIKeyManager.generate_api_key(user_id, "admin")
+        api_key = await APIKeyManager.generate_api_key_async(user_id, "admin")
         limits = get_rate_limit("admin")
         
         logger.info(f"✅ Bootstrap admin key created for user: {user_id}")
@@ -1002,7 +1042,7 @@ async def create_dev_api_key(tier: str = "pro"):
     try:
         # Generate key
         user_id = f"dev_user_{uuid.uuid4().hex[:8]}"
-        test_key = APIKeyManager.generate_api_key(user_id, tier)
+        test_key = await APIKeyManager.generate_api_key_async(user_id, tier)
         limits = get_rate_limit(tier)
         
         return {
@@ -70,7 +70,7 @@ class CircuitBreaker:
     
     def __enter__(self):
         """Context manager entry"""
-        if self.state == CircuitState.OPEN:
+        if self.state is CircuitState.OPEN:
             if self._should_attempt_reset():
                 self.state = CircuitState.HALF_OPEN
                 logger.info(f"Circuit '{self.name}' entering HALF_OPEN state")
@@ -86,6 +86,11 @@ class CircuitBreaker:
         """Context manager exit"""
         self.total_calls += 1
         
+        if exc_type is None and not self.failure_count and self.state is CircuitState.CLOSED:
+            # Healthy circuit: nothing to decay or transition
+            self.total_successes += 1
+            return False
+        
         if exc_type and issubclass(exc_type, self.expected_exception):
             # Failure occurred
             self._on_failure()
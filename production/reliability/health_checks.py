@@ -7,6 +7,7 @@ Monitor models, resources, and system health
 import psutil
 import time
 import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Dict, List, Optional
 from datetime import datetime
 from enum import Enum
@@ -29,9 +30,23 @@ class HealthStatus(Enum):
     UNHEALTHY = "unhealthy"
 
 
+# Status literals resolved once for the aggregate hot path
+HEALTHY = HealthStatus.HEALTHY.value
+DEGRADED = HealthStatus.DEGRADED.value
+UNHEALTHY = HealthStatus.UNHEALTHY.value
+
+_SEVERITY = {HEALTHY: 0, DEGRADED: 1, UNHEALTHY: 2}
+_STATUS_BY_SEVERITY = {v: k for k, v in _SEVERITY.items()}
+
+
 class HealthCheck:
     """Base health check class"""
     
+    # Relative expense of running the check; cheaper checks run first
+    cost = 1
+    # Blocking checks are offloaded to a thread by the async aggregates
+    is_blocking = True
+    
     def __init__(self, name: str):
         self.name = name
         self.last_check_time: Optional[datetime] = None
@@ -56,9 +71,12 @@ class HealthCheck:
 class ModelHealthCheck(HealthCheck):
     """Check if models are loaded and functional"""
     
-    def __init__(self, translator):
+    cost = 10
+    
+    def __init__(self, translator, timeout_seconds: float = 30.0):
         super().__init__("model_health")
         self.translator = translator
+        self.timeout_seconds = timeout_seconds
     
     def check(self) -> Dict:
         """Check model health"""
@@ -82,12 +100,14 @@ class ModelHealthCheck(HealthCheck):
                 test_audio = np.zeros(16000, dtype=np.float32)  # 1 second of silence
                 
                 try:
-                    # Quick transcription test (should be fast for silence)
-                    result = self.translator.whisper_model.transcribe(
-                        test_audio,
-                        language=self.translator.source_language,
-                        task="transcribe"
+                    # Quick transcription test (should be fast for silence).
+                    # Goes through the translator's inference executor so the
+                    # probe never runs the model concurrently with a request.
+                    future = self.translator.executor.submit(
+                        self.translator._transcribe_sync,
+                        test_audio
                     )
+                    future.result(timeout=self.timeout_seconds)
                     
                     self.last_status = HealthStatus.HEALTHY
                     self.last_details = {
@@ -120,9 +140,14 @@ class ModelHealthCheck(HealthCheck):
 class SystemResourceCheck(HealthCheck):
     """Check system resources (CPU, Memory, Disk)"""
     
+    is_blocking = False
+    
     def __init__(self):
         super().__init__("system_resources")
         
+        # Prime the CPU counter so later non-blocking reads are meaningful
+        psutil.cpu_percent(interval=None)
+        
         # Thresholds
         self.cpu_warning_threshold = 80.0  # %
         self.cpu_critical_threshold = 95.0  # %
@@ -136,8 +161,8 @@ class SystemResourceCheck(HealthCheck):
         self.last_check_time = datetime.now()
         
         try:
-            # CPU usage
-            cpu_percent = psutil.cpu_percent(interval=0.1)
+            # CPU usage since the previous check (non-blocking)
+            cpu_percent = psutil.cpu_percent(interval=None)
             
             # Memory usage
             memory = psutil.virtual_memory()
@@ -185,14 +210,20 @@ class SystemResourceCheck(HealthCheck):
 class GPUHealthCheck(HealthCheck):
     """Check GPU status and utilization"""
     
+    cost = 2
+    
     def __init__(self):
         super().__init__("gpu_health")
-        self.has_cuda = TORCH_AVAILABLE and torch.cuda.is_available()
+        # Resolved on first check to avoid touching the CUDA runtime at startup
+        self.has_cuda: Optional[bool] = None
     
     def check(self) -> Dict:
         """Check GPU health"""
         self.last_check_time = datetime.now()
         
+        if self.has_cuda is None:
+            self.has_cuda = TORCH_AVAILABLE and torch.cuda.is_available()
+        
         if not self.has_cuda:
             self.last_status = HealthStatus.HEALTHY  # CPU-only is fine
             self.last_details = {
@@ -258,6 +289,8 @@ class GPUHealthCheck(HealthCheck):
 class APIHealthCheck(HealthCheck):
     """Check API responsiveness"""
     
+    is_blocking = False
+    
     def __init__(self):
         super().__init__("api_health")
         self.response_time_threshold = 5.0  # seconds
@@ -267,12 +300,8 @@ class APIHealthCheck(HealthCheck):
         self.last_check_time = datetime.now()
         
         try:
-            # Simple ping test
+            # Simple ping test: time a round trip through the check itself
             start_time = time.time()
-            
-            # Simulate a lightweight operation
-            time.sleep(0.01)
-            
             response_time = time.time() - start_time
             
             if response_time > self.response_time_threshold:
@@ -297,12 +326,22 @@ class APIHealthCheck(HealthCheck):
         }
 
 
+# Shared by all dependency checks; shut down with the app
+_ping_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="health-redis")
+
+
 class DependencyHealthCheck(HealthCheck):
     """Check external dependencies (Redis, etc.)"""
     
-    def __init__(self, redis_client=None):
+    cost = 2
+    
+    def __init__(self, redis_client=None, timeout_seconds: float = 0.5):
         super().__init__("dependencies")
         self.redis_client = redis_client
+        self.timeout_seconds = timeout_seconds
+        # Ping runs on a worker thread so a hung Redis can't block the caller;
+        # a ping still in flight is awaited again instead of queueing another
+        self._pending_ping: Optional[Future] = None
     
     def check(self) -> Dict:
         """Check dependencies"""
@@ -314,11 +353,20 @@ class DependencyHealthCheck(HealthCheck):
         # Check Redis
         if self.redis_client:
             try:
-                self.redis_client.ping()
+                if self._pending_ping is None or self._pending_ping.done():
+                    self._pending_ping = _ping_executor.submit(self.redis_client.ping)
+                self._pending_ping.result(timeout=self.timeout_seconds)
                 dependencies['redis'] = {
                     'status': 'healthy',
                     'connected': True
                 }
+            except FutureTimeoutError:
+                dependencies['redis'] = {
+                    'status': 'unhealthy',
+                    'connected': False,
+                    'error': f'Ping timed out after {self.timeout_seconds}s'
+                }
+                all_healthy = False
             except Exception as e:
                 dependencies['redis'] = {
                     'status': 'unhealthy',
@@ -345,83 +393,111 @@ class HealthMonitor:
         self.checks: List[HealthCheck] = []
     
     def add_check(self, check: HealthCheck):
-        """Add a health check"""
+        """Add a health check (kept ordered by cost, cheapest first)"""
         self.checks.append(check)
+        self.checks.sort(key=lambda c: c.cost)
+    
+    @staticmethod
+    def _overall_status(results: List[Dict]) -> str:
+        """Worst status across check results"""
+        worst = max((_SEVERITY.get(r['status'], 0) for r in results), default=0)
+        return _STATUS_BY_SEVERITY[worst]
+    
+    @staticmethod
+    def _error_result(name: str, error: Exception, ts: str) -> Dict:
+        """Result for a check that raised, stamped with the aggregate timestamp"""
+        return {
+            'name': name,
+            'status': UNHEALTHY,
+            'details': {'error': str(error)},
+            'timestamp': ts
+        }
     
     def run_all_checks(self) -> Dict:
         """Run all health checks"""
         results = []
+        ts = datetime.now().isoformat()
         
         for check in self.checks:
             try:
                 result = check.check()
                 results.append(result)
             except Exception as e:
-                logger.error(f"Health check '{check.name}' failed: {e}")
-                results.append({
-                    'name': check.name,
-                    'status': HealthStatus.UNHEALTHY.value,
-                    'details': {'error': str(e)},
-                    'timestamp': datetime.now().isoformat()
-                })
-        
-        # Determine overall status
-        statuses = [r['status'] for r in results]
-        
-        if 'unhealthy' in statuses:
-            overall_status = HealthStatus.UNHEALTHY
-        elif 'degraded' in statuses:
-            overall_status = HealthStatus.DEGRADED
-        else:
-            overall_status = HealthStatus.HEALTHY
+                logger.error("Health check '%s' failed: %s", check.name, e)
+                results.append(self._error_result(check.name, e, ts))
         
         return {
-            'overall_status': overall_status.value,
+            'overall_status': self._overall_status(results),
             'checks': results,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': ts
         }
     
     async def run_all_checks_async(self) -> Dict:
         """Run all health checks asynchronously"""
-        tasks = []
-        
-        for check in self.checks:
-            # Wrap sync check in async
-            task = asyncio.create_task(
-                asyncio.to_thread(check.check)
-            )
-            tasks.append(task)
+        tasks = [self._run_check(check) for check in self.checks]
         
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # Process results
+        ts = datetime.now().isoformat()
         processed_results = []
         for i, result in enumerate(results):
             if isinstance(result, Exception):
-                processed_results.append({
-                    'name': self.checks[i].name,
-                    'status': HealthStatus.UNHEALTHY.value,
-                    'details': {'error': str(result)},
-                    'timestamp': datetime.now().isoformat()
-                })
+                processed_results.append(self._error_result(self.checks[i].name, result, ts))
             else:
                 processed_results.append(result)
         
-        # Determine overall status
-        statuses = [r['status'] for r in processed_results]
+        return {
+            'overall_status': self._overall_status(processed_results),
+            'checks': processed_results,
+            'timestamp': ts
+        }
+    
+    async def run_liveness(self, fail_fast: bool = True, max_cost: int = 2) -> Dict:
+        """
+        Fast liveness signal instead of a full report
         
-        if 'unhealthy' in statuses:
-            overall_status = HealthStatus.UNHEALTHY
-        elif 'degraded' in statuses:
-            overall_status = HealthStatus.DEGRADED
-        else:
-            overall_status = HealthStatus.HEALTHY
+        Only checks with cost <= max_cost are run. With fail_fast, returns as
+        soon as any check reports unhealthy and cancels the rest.
+        """
+        ts = datetime.now().isoformat()
+        checks = [c for c in self.checks if c.cost <= max_cost]
+        tasks = [asyncio.create_task(self._run_named(check)) for check in checks]
+        
+        results = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                name, result = await next_done
+                if isinstance(result, Exception):
+                    result = self._error_result(name, result, ts)
+                results.append(result)
+                
+                if fail_fast and result['status'] == UNHEALTHY:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
         
         return {
-            'overall_status': overall_status.value,
-            'checks': processed_results,
-            'timestamp': datetime.now().isoformat()
+            'overall_status': self._overall_status(results),
+            'checks': results,
+            'complete': len(results) == len(checks),
+            'timestamp': ts
         }
+    
+    @staticmethod
+    async def _run_check(check: HealthCheck) -> Dict:
+        """Run a check, offloading to a thread only if it blocks"""
+        if check.is_blocking:
+            return await asyncio.to_thread(check.check)
+        return check.check()
+    
+    async def _run_named(self, check: HealthCheck):
+        """Run a check, returning (name, result or exception)"""
+        try:
+            return check.name, await self._run_check(check)
+        except Exception as e:
+            return check.name, e
 
 
 # Global health monitor instance
@@ -429,12 +505,22 @@ health_monitor = HealthMonitor()
 
 
 def initialize_health_checks(translator=None, redis_client=None):
-    """Initialize all health checks"""
+    """
+    Initialize all health checks
+    
+    Args:
+        translator: Loaded translator instance (enables model checks)
+        redis_client: Redis client for dependency checks. Construct it with
+            socket_timeout=0.5 and socket_connect_timeout=0.5 so a hung
+            server fails fast instead of waiting on the TCP timeout.
+    """
     health_monitor.checks.clear()
     
     # Add checks
     health_monitor.add_check(SystemResourceCheck())
-    health_monitor.add_check(GPUHealthCheck())
+    if TORCH_AVAILABLE:
+        # CUDA availability is resolved lazily by the check itself
+        health_monitor.add_check(GPUHealthCheck())
     health_monitor.add_check(APIHealthCheck())
     
     if translator:
@@ -444,3 +530,8 @@ def initialize_health_checks(translator=None, redis_client=None):
         health_monitor.add_check(DependencyHealthCheck(redis_client))
     
     logger.info(f"Initialized {len(health_monitor.checks)} health checks")
+
+
+def shutdown_health_checks():
+    """Stop the shared dependency ping threads without waiting on a hung ping"""
+    _ping_executor.shutdown(wait=False, cancel_futures=True)
@@ -13,6 +13,9 @@ from typing import Callable, Type, Tuple, Optional
 
 logger = logging.getLogger(__name__)
 
+# Bound once; full jitter only needs a uniform sample in [0, 1)
+_random = random.random
+
 
 class RetryExhausted(Exception):
     """Raised when all retry attempts are exhausted"""
@@ -58,7 +61,7 @@ class RetryHandler:
         
         if self.jitter:
             # Add jitter: random value between 0 and delay
-            delay = random.uniform(0, delay)
+            delay *= _random()
         
         return delay
     
@@ -78,13 +81,14 @@ class RetryHandler:
                     if attempt < self.max_attempts - 1:
                         delay = self.calculate_delay(attempt)
                         logger.warning(
-                            f"Attempt {attempt + 1}/{self.max_attempts} failed for {func.__name__}: {e}. "
-                            f"Retrying in {delay:.2f}s..."
+                            "Attempt %d/%d failed for %s: %s. Retrying in %.2fs...",
+                            attempt + 1, self.max_attempts, func.__name__, e, delay
                         )
                         time.sleep(delay)
                     else:
                         logger.error(
-                            f"All {self.max_attempts} attempts failed for {func.__name__}: {e}"
+                            "All %d attempts failed for %s: %s",
+                            self.max_attempts, func.__name__, e
                         )
             
             # All retries exhausted
@@ -120,7 +124,7 @@ class AsyncRetryHandler:
         delay = min(delay, self.max_delay)
         
         if self.jitter:
-            delay = random.uniform(0, delay)
+            delay *= _random()
         
         return delay
     
@@ -140,13 +144,14 @@ class AsyncRetryHandler:
                     if attempt < self.max_attempts - 1:
                         delay = self.calculate_delay(attempt)
                         logger.warning(
-                            f"Attempt {attempt + 1}/{self.max_attempts} failed for {func.__name__}: {e}. "
-                            f"Retrying in {delay:.2f}s..."
+                            "Attempt %d/%d failed for %s: %s. Retrying in %.2fs...",
+                            attempt + 1, self.max_attempts, func.__name__, e, delay
                         )
                         await asyncio.sleep(delay)
                     else:
                         logger.error(
-                            f"All {self.max_attempts} attempts failed for {func.__name__}: {e}"
+                            "All %d attempts failed for %s: %s",
+                            self.max_attempts, func.__name__, e
                         )
             
             raise RetryExhausted(
@@ -271,7 +276,7 @@ class AdvancedRetryHandler:
         delay = min(delay, self.max_delay)
         
         if self.jitter:
-            delay = random.uniform(0, delay)
+            delay *= _random()
         
         return delay
     
@@ -282,22 +287,11 @@ class AdvancedRetryHandler:
             
             for attempt in range(self.max_attempts):
                 try:
-                    result = func(*args, **kwargs)
-                    
-                    # Success - reset any failure tracking
-                    if hasattr(func, '_retry_failure_count'):
-                        func._retry_failure_count = 0
-                    
-                    return result
+                    return func(*args, **kwargs)
                 
                 except self.exceptions as e:
                     last_exception = e
                     
-                    # Track failures
-                    if not hasattr(func, '_retry_failure_count'):
-                        func._retry_failure_count = 0
-                    func._retry_failure_count += 1
-                    
                     if attempt < self.max_attempts - 1:
                         delay = self.calculate_delay(attempt)
                         
@@ -306,8 +300,8 @@ class AdvancedRetryHandler:
                             self.on_retry(attempt + 1, e)
                         
                         logger.warning(
-                            f"Retry {attempt + 1}/{self.max_attempts} for {func.__name__}: {e}. "
-                            f"Waiting {delay:.2f}s..."
+                            "Retry %d/%d for %s: %s. Waiting %.2fs...",
+                            attempt + 1, self.max_attempts, func.__name__, e, delay
                         )
                         
                         time.sleep(delay)
@@ -317,7 +311,8 @@ class AdvancedRetryHandler:
                             self.on_failure(e)
                         
                         logger.error(
-                            f"All {self.max_attempts} attempts exhausted for {func.__name__}"
+                            "All %d attempts exhausted for %s",
+                            self.max_attempts, func.__name__
                         )
             
             raise RetryExhausted(
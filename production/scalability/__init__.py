@@ -1,8 +1,10 @@
 # Scalability components
-from .async_translator import AsyncRealtimeTranslator
+from .async_translator import AsyncRealtimeTranslator, create_onnx_session
 from .cache_manager import cache_manager, translation_cache, transcription_cache, hash_audio, CacheManager
+from .redis_pool import get_client, get_pool, get_async_client, AutoPipeline
 
 __all__ = [
-    'AsyncRealtimeTranslator',
-    'cache_manager', 'translation_cache', 'transcription_cache', 'hash_audio', 'CacheManager'
+    'AsyncRealtimeTranslator', 'create_onnx_session',
+    'cache_manager', 'translation_cache', 'transcription_cache', 'hash_audio', 'CacheManager',
+    'get_client', 'get_pool', 'get_async_client', 'AutoPipeline'
 ]
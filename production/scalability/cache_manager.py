@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
 """
 Cache Manager with Redis
-SECURE VERSION - Uses JSON instead of pickle (no RCE risk)
+SECURE VERSION - Uses msgpack/JSON instead of pickle (no RCE risk)
 WITH CIRCUIT BREAKER PROTECTION
 """
 
+import asyncio
 import hashlib
 import json
-from typing import Optional, Any
+import threading
+from typing import Optional, Any, BinaryIO, Dict, List, Union
 import logging
 import os
 
@@ -16,11 +18,34 @@ logger = logging.getLogger(__name__)
 # Try to import redis
 try:
     import redis
+    from scalability.redis_pool import get_client
     REDIS_AVAILABLE = True
 except ImportError:
     REDIS_AVAILABLE = False
     logger.warning("Redis not installed. Install with: pip install redis")
 
+# Try to import msgpack (compact binary serialization)
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+    logger.warning("msgpack not installed. Falling back to JSON. Install with: pip install msgpack")
+
+# Try to import orjson (faster sorted JSON for dict cache keys)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Try to import zstandard (compression for large values)
+try:
+    import zstandard as zstd
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
 # Import circuit breaker
 from reliability.circuit_breaker import CircuitBreaker
 
@@ -35,6 +60,10 @@ class SecureJSONEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+# Same bytes/numpy handling for orjson
+_SECURE_DEFAULT = SecureJSONEncoder().default
+
+
 def secure_json_decoder(dct):
     """Custom JSON decoder"""
     if "__type__" in dct:
@@ -46,8 +75,130 @@ def secure_json_decoder(dct):
     return dct
 
 
+def _key_json(data: Any) -> bytes:
+    """
+    Canonical (sorted-key) JSON bytes for hashing non-tuple key data
+
+    The stdlib fallback is formatted like orjson (compact, raw UTF-8) so
+    workers with and without orjson installed compute the same cache keys.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, default=_SECURE_DEFAULT, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(
+        data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, cls=SecureJSONEncoder
+    ).encode()
+
+
+# Stored values start with a 1-byte tag naming their encoding.
+# Untagged values are legacy JSON strings written by older versions.
+_TAG_MSGPACK = b'\x01'
+_TAG_JSON = b'\x02'
+_TAG_MSGPACK_ZSTD = b'\x03'
+
+# Payloads above this size are zstd-compressed
+_COMPRESS_THRESHOLD = 1024
+
+# Audio fingerprint width and file read size for hash_audio
+_AUDIO_DIGEST_BYTES = 16
+_AUDIO_READ_CHUNK = 1 << 20
+
+# RSS / used_memory above which get_stats warns about fragmentation
+_FRAGMENTATION_WARN_RATIO = 1.4
+
+# Keys per UNLINK when clearing by pattern
+_DELETE_BATCH_SIZE = 500
+
+
+def serialize_value(value: Any) -> bytes:
+    """
+    Serialize a value for Redis
+
+    msgpack is used for plain str/dict/list/bytes values and compressed with
+    zstd above _COMPRESS_THRESHOLD. Anything msgpack can't encode (e.g. numpy
+    arrays) falls back to tagged JSON. Never pickle.
+    """
+    if MSGPACK_AVAILABLE:
+        try:
+            payload = msgpack.packb(value, use_bin_type=True)
+        except (TypeError, ValueError, OverflowError):
+            payload = None
+
+        if payload is not None:
+            if ZSTD_AVAILABLE and len(payload) > _COMPRESS_THRESHOLD:
+                return _TAG_MSGPACK_ZSTD + zstd.compress(payload, 3)
+            return _TAG_MSGPACK + payload
+
+    return _TAG_JSON + json.dumps(value, cls=SecureJSONEncoder).encode()
+
+
+def deserialize_value(raw: Any) -> Any:
+    """
+    Deserialize a value read from Redis
+
+    Raises:
+        ValueError: If the value can't be decoded
+    """
+    tag = raw[:1]
+
+    if tag == _TAG_MSGPACK or tag == _TAG_MSGPACK_ZSTD:
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("msgpack value cached but msgpack not installed")
+        payload = raw[1:]
+        if tag == _TAG_MSGPACK_ZSTD:
+            if not ZSTD_AVAILABLE:
+                raise ValueError("zstd value cached but zstandard not installed")
+            payload = zstd.decompress(payload)
+        # Non-str map keys (e.g. {1: 'a'}) pack fine, so they must read back too
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+    if tag == _TAG_JSON:
+        raw = raw[1:]
+
+    # Tagged or legacy JSON (json.JSONDecodeError is a ValueError)
+    return json.loads(raw, object_hook=secure_json_decoder)
+
+
+_HIT, _MISS, _SET, _DROPPED = 0, 1, 2, 3
+
+
+class _ThreadCounters:
+    """
+    Per-thread counter slots summed on read
+    
+    `self.hits += 1` from several worker threads is a read-modify-write on a
+    shared attribute and can lose updates. Here each thread only writes its
+    own slot, so increments need no lock; readers sum all slots.
+    """
+    
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._slots: List[List[int]] = []
+        self._lock = threading.Lock()
+    
+    def _slot(self) -> List[int]:
+        slot = getattr(self._local, 'slot', None)
+        if slot is None:
+            slot = [0] * self._size
+            self._local.slot = slot
+            with self._lock:
+                self._slots.append(slot)
+        return slot
+    
+    def add(self, index: int, n: int = 1):
+        self._slot()[index] += n
+    
+    def total(self, index: int) -> int:
+        with self._lock:
+            return sum(slot[index] for slot in self._slots)
+    
+    def set_total(self, index: int, value: int):
+        """Adjust this thread's slot so the total reads `value`"""
+        self._slot()[index] += value - self.total(index)
+
+
 class CacheManager:
-    """Redis-based cache manager - SECURE VERSION with JSON serialization"""
+    """Redis-based cache manager - SECURE VERSION with msgpack/JSON serialization"""
     
     def __init__(
         self,
@@ -63,11 +214,16 @@ class CacheManager:
         self.redis_client = None
         self.enabled = False
         self.default_ttl = default_ttl
+        self._use_unlink = True
         
         # Statistics
-        self.hits = 0
-        self.misses = 0
-        self.sets = 0
+        self._counts = _ThreadCounters(4)
+        
+        # Write-behind queue (see start_write_behind); None = synchronous sets
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._write_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._drain_task: Optional[asyncio.Task] = None
+        self._unflushed: List[tuple] = []
         
         # Circuit breaker for Redis operations
         self.redis_breaker = CircuitBreaker(
@@ -85,54 +241,99 @@ class CacheManager:
         port = port or int(os.getenv("REDIS_PORT", 6379))
         
         try:
-            self.redis_client = redis.Redis(
+            # Shared pool (raw bytes for tagged msgpack/JSON values)
+            self.redis_client = get_client(
+                decode_responses=False,
                 host=host,
                 port=port,
                 db=db,
-                password=password,
-                decode_responses=True,  # Decode to strings for JSON
-                socket_timeout=5,
-                socket_connect_timeout=5,
-                retry_on_timeout=True,
-                health_check_interval=30
+                password=password
             )
             
             # Test connection
             self.redis_client.ping()
             self.enabled = True
             logger.info(f"✅ Secure cache manager connected to Redis at {host}:{port}")
+            
+            if os.getenv("REDIS_ACTIVE_DEFRAG", "false").lower() == "true":
+                self._enable_active_defrag()
         
         except Exception as e:
             logger.warning(f"Failed to connect to Redis: {e}. Caching disabled.")
             self.redis_client = None
             self.enabled = False
     
+    @property
+    def hits(self) -> int:
+        return self._counts.total(_HIT)
+    
+    @hits.setter
+    def hits(self, value: int):
+        self._counts.set_total(_HIT, value)
+    
+    @property
+    def misses(self) -> int:
+        return self._counts.total(_MISS)
+    
+    @misses.setter
+    def misses(self, value: int):
+        self._counts.set_total(_MISS, value)
+    
+    @property
+    def sets(self) -> int:
+        return self._counts.total(_SET)
+    
+    @sets.setter
+    def sets(self, value: int):
+        self._counts.set_total(_SET, value)
+    
+    def _enable_active_defrag(self):
+        """
+        Turn on Redis active defragmentation (best-effort)
+        
+        Only for a Redis instance dedicated to this cache: CONFIG SET is
+        server-wide. Managed Redis often disables CONFIG, and servers not
+        built with jemalloc reject activedefrag; both are logged and ignored.
+        """
+        try:
+            self.redis_client.config_set("activedefrag", "yes")
+            self.redis_client.config_set("active-defrag-ignore-bytes", "100mb")
+            self.redis_client.config_set("active-defrag-threshold-lower", "10")
+            logger.info("Redis active defragmentation enabled")
+        except Exception as e:
+            logger.warning(f"Could not enable Redis active defragmentation: {e}")
+    
     def _generate_key(self, prefix: str, data: Any) -> str:
         """
         Generate cache key from data
         
         Args:
             prefix: Key prefix
-            data: Data to hash
+            data: Data to hash. Tuples of strings are joined with a unit
+                separator (fast path); other types are hashed as sorted JSON.
         
         Returns:
             Cache key
         """
         # Create hash of data
         if isinstance(data, str):
-            data_str = data
+            data_bytes = data.encode()
+        elif isinstance(data, tuple):
+            # One join and one encode; no per-field bytes objects
+            data_bytes = "\x1f".join(map(str, data)).encode()
         else:
-            data_str = json.dumps(data, sort_keys=True, cls=SecureJSONEncoder)
+            data_bytes = _key_json(data)
         
-        hash_hex = hashlib.sha256(data_str.encode()).hexdigest()[:16]
+        # 64-bit BLAKE2b digest: same key width as before, cheaper than SHA-256
+        hash_hex = hashlib.blake2b(data_bytes, digest_size=8).hexdigest()
         return f"{prefix}:{hash_hex}"
     
     def get(self, key: str) -> Optional[Any]:
         """
-        Get value from cache - SECURE with JSON
+        Get value from cache - SECURE with msgpack/JSON
         """
         if not self.enabled:
-            self.misses += 1
+            self._counts.add(_MISS)
             return None
         
         try:
@@ -140,51 +341,240 @@ class CacheManager:
                 value = self.redis_client.get(key)
                 
                 if value is None:
-                    self.misses += 1
+                    self._counts.add(_MISS)
                     return None
                 
-                # Deserialize from JSON (SECURE - no RCE risk)
+                # Deserialize from msgpack/JSON (SECURE - no RCE risk)
                 try:
-                    deserialized = json.loads(value, object_hook=secure_json_decoder)
-                    self.hits += 1
+                    deserialized = deserialize_value(value)
+                    self._counts.add(_HIT)
                     logger.debug(f"Cache HIT: {key}")
                     return deserialized
-                except json.JSONDecodeError as e:
+                except Exception as e:
                     logger.error(f"Failed to deserialize cache value: {e}")
-                    self.misses += 1
+                    self._counts.add(_MISS)
                     return None
         
         except Exception as e:
             logger.error(f"Cache get error for key {key}: {e}")
-            self.misses += 1
+            self._counts.add(_MISS)
             return None
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None):
         """
-        Set value in cache - SECURE with JSON
+        Set value in cache - SECURE with msgpack/JSON
         """
         if not self.enabled:
             return
         
+        ttl = ttl or self.default_ttl
+        
+        if self._queue_write(key, value, ttl):
+            return
+        
         try:
             with self.redis_breaker:
-                # Serialize to JSON (SECURE - no RCE risk)
+                # Serialize to msgpack/JSON (SECURE - no RCE risk)
                 try:
-                    serialized = json.dumps(value, cls=SecureJSONEncoder)
+                    serialized = serialize_value(value)
                 except (TypeError, ValueError) as e:
                     logger.error(f"Failed to serialize value for caching: {e}")
                     return
                 
                 # Set with TTL
-                ttl = ttl or self.default_ttl
                 self.redis_client.setex(key, ttl, serialized)
                 
-                self.sets += 1
+                self._counts.add(_SET)
                 logger.debug(f"Cache SET: {key} (TTL: {ttl}s)")
         
         except Exception as e:
             logger.error(f"Cache set error for key {key}: {e}")
     
+    def _queue_write(self, key: str, value: Any, ttl: int) -> bool:
+        """
+        Hand a write to the background drain task
+        
+        Returns:
+            False if write-behind is off or we're not on its event loop
+            (caller should write synchronously)
+        """
+        if self._write_queue is None:
+            return False
+        
+        try:
+            if asyncio.get_running_loop() is not self._write_loop:
+                return False
+        except RuntimeError:
+            return False
+        
+        try:
+            serialized = serialize_value(value)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Failed to serialize value for caching: {e}")
+            return True
+        
+        try:
+            self._write_queue.put_nowait((key, ttl, serialized))
+        except asyncio.QueueFull:
+            # Cache is best-effort: drop rather than block the request
+            self._counts.add(_DROPPED)
+        return True
+    
+    async def start_write_behind(
+        self,
+        max_pending: int = 10000,
+        max_batch: int = 256,
+        max_wait_ms: float = 50
+    ):
+        """
+        Make set() fire-and-forget on the running event loop
+        
+        Writes are queued and flushed by a background task in pipelined
+        batches of up to max_batch, or whatever arrived within max_wait_ms.
+        """
+        if not self.enabled or self._drain_task is not None:
+            return
+        
+        self._write_loop = asyncio.get_running_loop()
+        self._write_queue = asyncio.Queue(maxsize=max_pending)
+        self._drain_task = asyncio.create_task(
+            self._drain_loop(max_batch, max_wait_ms / 1000)
+        )
+        logger.info("Cache write-behind enabled")
+    
+    async def stop_write_behind(self):
+        """Flush queued writes and return set() to synchronous mode"""
+        if self._drain_task is None:
+            return
+        
+        self._drain_task.cancel()
+        try:
+            await self._drain_task
+        except asyncio.CancelledError:
+            pass
+        
+        pending, self._unflushed = self._unflushed, []
+        while not self._write_queue.empty():
+            pending.append(self._write_queue.get_nowait())
+        
+        self._drain_task = None
+        self._write_queue = None
+        self._write_loop = None
+        
+        if pending:
+            await asyncio.get_running_loop().run_in_executor(None, self._flush_writes, pending)
+    
+    async def _drain_loop(self, max_batch: int, max_wait: float):
+        """Collect queued writes into batches and flush them off the loop"""
+        loop = asyncio.get_running_loop()
+        queue = self._write_queue
+        
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + max_wait
+            
+            try:
+                while len(batch) < max_batch:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Stopped mid-collection: hand the batch back for the final flush
+                self._unflushed = batch
+                raise
+            
+            await loop.run_in_executor(None, self._flush_writes, batch)
+    
+    def _flush_writes(self, batch: List[tuple]):
+        """Write (key, ttl, serialized) entries in one pipeline"""
+        try:
+            with self.redis_breaker:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key, ttl, serialized in batch:
+                    pipe.setex(key, ttl, serialized)
+                pipe.execute()
+                self._counts.add(_SET, len(batch))
+                logger.debug(f"Cache write-behind flushed {len(batch)} keys")
+        except Exception as e:
+            self._counts.add(_DROPPED, len(batch))
+            logger.error(f"Cache write-behind flush error ({len(batch)} keys): {e}")
+    
+    def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        Get several values in one round-trip (MGET)
+        
+        Returns:
+            Values in key order, None for misses
+        """
+        if not keys:
+            return []
+        
+        if not self.enabled:
+            self._counts.add(_MISS, len(keys))
+            return [None] * len(keys)
+        
+        try:
+            with self.redis_breaker:
+                raw_values = self.redis_client.mget(keys)
+        except Exception as e:
+            logger.error(f"Cache mget error for {len(keys)} keys: {e}")
+            self._counts.add(_MISS, len(keys))
+            return [None] * len(keys)
+        
+        results = []
+        for key, value in zip(keys, raw_values):
+            if value is None:
+                results.append(None)
+                continue
+            try:
+                results.append(deserialize_value(value))
+            except Exception as e:
+                logger.error(f"Failed to deserialize cache value for {key}: {e}")
+                results.append(None)
+        
+        hits = sum(1 for value in results if value is not None)
+        self._counts.add(_HIT, hits)
+        self._counts.add(_MISS, len(keys) - hits)
+        return results
+    
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None):
+        """
+        Set several values in one round-trip (non-transactional pipeline)
+        
+        Args:
+            items: Mapping of cache key to value
+            ttl: Time-to-live in seconds, shared by all items
+        """
+        if not self.enabled or not items:
+            return
+        
+        ttl = ttl or self.default_ttl
+        
+        try:
+            with self.redis_breaker:
+                pipe = self.redis_client.pipeline(transaction=False)
+                count = 0
+                for key, value in items.items():
+                    try:
+                        serialized = serialize_value(value)
+                    except (TypeError, ValueError) as e:
+                        logger.error(f"Failed to serialize value for caching: {e}")
+                        continue
+                    pipe.setex(key, ttl, serialized)
+                    count += 1
+                
+                if count:
+                    pipe.execute()
+                    self._counts.add(_SET, count)
+                    logger.debug(f"Cache SET many: {count} keys (TTL: {ttl}s)")
+        
+        except Exception as e:
+            logger.error(f"Cache set_many error for {len(items)} keys: {e}")
+    
     def delete(self, key: str):
         """Delete key from cache"""
         if not self.enabled:
@@ -207,13 +597,39 @@ class CacheManager:
             return
         
         try:
-            keys = list(self.redis_client.scan_iter(pattern))  # Safe for large datasets
-            if keys:
-                self.redis_client.delete(*keys)
-                logger.info(f"Cleared {len(keys)} keys matching pattern: {pattern}")
+            count = 0
+            batch = []
+            # SCAN pages through the keyspace without blocking the server
+            for key in self.redis_client.scan_iter(match=pattern, count=1000):
+                batch.append(key)
+                if len(batch) >= _DELETE_BATCH_SIZE:
+                    self._unlink_batch(batch)
+                    count += len(batch)
+                    batch = []
+            
+            if batch:
+                self._unlink_batch(batch)
+                count += len(batch)
+            
+            if count:
+                logger.info(f"Cleared {count} keys matching pattern: {pattern}")
         except Exception as e:
             logger.error(f"Cache clear pattern error: {e}")
     
+    def _unlink_batch(self, keys: List[Any]):
+        """
+        Delete keys with UNLINK (memory freed in the background),
+        falling back to DEL on servers older than Redis 4.0
+        """
+        if self._use_unlink:
+            try:
+                self.redis_client.unlink(*keys)
+                return
+            except redis.ResponseError:
+                self._use_unlink = False
+        
+        self.redis_client.delete(*keys)
+    
     def clear_all(self):
         """Clear entire cache"""
         if not self.enabled:
@@ -227,25 +643,41 @@ class CacheManager:
     
     def get_stats(self) -> dict:
         """Get cache statistics"""
-        total_requests = self.hits + self.misses
-        hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
+        hits, misses, sets = self.hits, self.misses, self.sets
+        total_requests = hits + misses
+        hit_rate = (hits / total_requests * 100) if total_requests > 0 else 0
         
         stats = {
             'enabled': self.enabled,
-            'hits': self.hits,
-            'misses': self.misses,
-            'sets': self.sets,
+            'hits': hits,
+            'misses': misses,
+            'sets': sets,
             'hit_rate': round(hit_rate, 2),
-            'serialization': 'JSON (secure)'  # Indicate secure serialization
+            'dropped_writes': self._counts.total(_DROPPED),
+            'pending_writes': self._write_queue.qsize() if self._write_queue is not None else 0,
+            'serialization': 'msgpack (secure)' if MSGPACK_AVAILABLE else 'JSON (secure)'
         }
         
         if self.enabled:
             try:
-                info = self.redis_client.info()
+                # Only the two sections we read, in one round-trip
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.info("memory")
+                pipe.info("clients")
+                memory, clients = pipe.execute()
                 stats['redis_memory_used_mb'] = round(
-                    info.get('used_memory', 0) / (1024 * 1024), 2
+                    memory.get('used_memory', 0) / (1024 * 1024), 2
                 )
-                stats['redis_connected_clients'] = info.get('connected_clients', 0)
+                stats['redis_connected_clients'] = clients.get('connected_clients', 0)
+                
+                fragmentation = memory.get('mem_fragmentation_ratio', 0)
+                stats['redis_fragmentation_ratio'] = fragmentation
+                if fragmentation > _FRAGMENTATION_WARN_RATIO:
+                    logger.warning(
+                        f"Redis memory fragmentation ratio {fragmentation} > "
+                        f"{_FRAGMENTATION_WARN_RATIO}: consider REDIS_ACTIVE_DEFRAG=true, "
+                        f"MEMORY PURGE or a restart"
+                    )
             except Exception as e:
                 logger.error(f"Error getting Redis info: {e}")
         
@@ -276,13 +708,7 @@ class TranslationCache:
         Returns:
             Translated text or None
         """
-        cache_data = {
-            'text': text,
-            'source': source_lang,
-            'target': target_lang
-        }
-        key = self.cache._generate_key(self.prefix, cache_data)
-        return self.cache.get(key)
+        return self.cache.get(self._key(text, source_lang, target_lang))
     
     def set_translation(
         self,
@@ -302,13 +728,45 @@ class TranslationCache:
             translation: Translated text
             ttl: Time-to-live in seconds
         """
-        cache_data = {
-            'text': text,
-            'source': source_lang,
-            'target': target_lang
+        self.cache.set(self._key(text, source_lang, target_lang), translation, ttl)
+    
+    def get_translations(
+        self,
+        texts: List[str],
+        source_lang: str,
+        target_lang: str
+    ) -> List[Optional[str]]:
+        """
+        Get cached translations for several texts in one round-trip
+        
+        Returns:
+            Translations in input order, None for misses
+        """
+        keys = [self._key(text, source_lang, target_lang) for text in texts]
+        return self.cache.get_many(keys)
+    
+    def set_translations(
+        self,
+        translations: Dict[str, str],
+        source_lang: str,
+        target_lang: str,
+        ttl: int = 86400
+    ):
+        """
+        Cache several translations in one round-trip
+        
+        Args:
+            translations: Mapping of source text to translated text
+        """
+        items = {
+            self._key(text, source_lang, target_lang): translation
+            for text, translation in translations.items()
         }
-        key = self.cache._generate_key(self.prefix, cache_data)
-        self.cache.set(key, translation, ttl)
+        self.cache.set_many(items, ttl)
+    
+    def _key(self, text: str, source_lang: str, target_lang: str) -> str:
+        """Cache key for one (text, source, target) triple"""
+        return self.cache._generate_key(self.prefix, (text, source_lang, target_lang))
 
 
 class TranscriptionCache:
@@ -333,11 +791,7 @@ class TranscriptionCache:
         Returns:
             Transcribed text or None
         """
-        cache_data = {
-            'audio_hash': audio_hash,
-            'language': language
-        }
-        key = self.cache._generate_key(self.prefix, cache_data)
+        key = self.cache._generate_key(self.prefix, (audio_hash, language))
         return self.cache.get(key)
     
     def set_transcription(
@@ -356,25 +810,42 @@ class TranscriptionCache:
             transcription: Transcribed text
             ttl: Time-to-live in seconds
         """
-        cache_data = {
-            'audio_hash': audio_hash,
-            'language': language
-        }
-        key = self.cache._generate_key(self.prefix, cache_data)
+        key = self.cache._generate_key(self.prefix, (audio_hash, language))
         self.cache.set(key, transcription, ttl)
 
 
-def hash_audio(audio_data: bytes) -> str:
+def hash_audio(audio_data: Union[bytes, bytearray, memoryview, BinaryIO]) -> str:
     """
     Generate hash for audio data
     
     Args:
-        audio_data: Audio bytes
+        audio_data: Audio bytes, or a binary file object which is hashed in
+            chunks without reading it fully into memory
     
     Returns:
-        Hash string
+        32-char hex fingerprint (128 bits)
     """
-    return hashlib.sha256(audio_data).hexdigest()
+    # Always BLAKE2b: every worker must compute the same fingerprint, so no
+    # optional faster hasher that would split the transcription cache
+    hasher = hashlib.blake2b(digest_size=_AUDIO_DIGEST_BYTES)
+    
+    if hasattr(audio_data, "readinto"):
+        buf = bytearray(_AUDIO_READ_CHUNK)
+        view = memoryview(buf)
+        while True:
+            n = audio_data.readinto(buf)
+            if not n:
+                break
+            hasher.update(view[:n])
+    elif hasattr(audio_data, "read"):
+        # File-like objects without readinto (e.g. some stream wrappers)
+        for chunk in iter(lambda: audio_data.read(_AUDIO_READ_CHUNK), b""):
+            hasher.update(chunk)
+    else:
+        # memoryview avoids copying bytearray/memoryview inputs
+        hasher.update(memoryview(audio_data))
+    
+    return hasher.hexdigest()
 
 
 # Global cache instance
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Shared Redis Connection Pools
+One pool per decoding mode, shared by cache, auth, rate limiting and quotas
+so connections stay warm instead of each module opening its own sockets
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import redis
+import redis.asyncio as aioredis
+from redis.commands import AsyncCoreCommands
+
+logger = logging.getLogger(__name__)
+
+# Max sockets per pool (per worker process)
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", 64))
+
+# Max commands sent in one auto-pipelined write
+AUTO_PIPELINE_MAX_BATCH = 256
+
+# Settings shared by every pool. redis-py already sets TCP_NODELAY on each
+# socket; keepalive probes drop half-open connections (e.g. after a NAT or
+# failover) instead of letting a request hang on them until socket_timeout.
+_KEEPALIVE_OPTIONS = {
+    getattr(socket, name): value
+    for name, value in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 30), ("TCP_KEEPCNT", 3))
+    if hasattr(socket, name)
+}
+_CONNECTION_SETTINGS = {
+    "max_connections": REDIS_POOL_SIZE,
+    "timeout": 5,
+    "socket_timeout": 5,
+    "socket_connect_timeout": 5,
+    "socket_keepalive": True,
+    "socket_keepalive_options": _KEEPALIVE_OPTIONS,
+    "retry_on_timeout": True,
+    "health_check_interval": 30,
+}
+
+_pools: Dict[Tuple, redis.ConnectionPool] = {}
+_async_pools: Dict[Tuple, aioredis.ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(
+    decode_responses: bool = True,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    db: int = 0,
+    password: Optional[str] = None
+) -> redis.ConnectionPool:
+    """
+    Get the shared connection pool for these settings
+
+    redis-py applies decode_responses per connection, so clients that want
+    str replies and clients that want raw bytes can't share one pool. Each
+    distinct combination gets exactly one pool per process.
+
+    Connection settings default to REDIS_HOST / REDIS_PORT / REDIS_PASSWORD,
+    read on first use so REDIS_URL parsing at startup is honoured.
+    """
+    host = host or os.getenv("REDIS_HOST", "localhost")
+    port = port or int(os.getenv("REDIS_PORT", 6379))
+    password = password or os.getenv("REDIS_PASSWORD")
+
+    key = (host, port, db, password, decode_responses)
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            # Blocking pool: wait for a free connection under load
+            # instead of failing with "Too many connections"
+            pool = redis.BlockingConnectionPool(
+                host=host,
+                port=port,
+                db=db,
+                password=password,
+                decode_responses=decode_responses,
+                **_CONNECTION_SETTINGS
+            )
+            _pools[key] = pool
+        return pool
+
+
+def get_client(decode_responses: bool = True, **kwargs) -> redis.Redis:
+    """Redis client backed by the shared pool for these settings"""
+    return redis.Redis(connection_pool=get_pool(decode_responses, **kwargs))
+
+
+def get_async_pool(
+    decode_responses: bool = True,
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    db: int = 0,
+    password: Optional[str] = None
+) -> aioredis.ConnectionPool:
+    """
+    Get the shared asyncio connection pool for these settings
+
+    Same settings and memoization as get_pool(). Connections are created
+    lazily on the running event loop, so one pool serves one worker's loop.
+    """
+    host = host or os.getenv("REDIS_HOST", "localhost")
+    port = port or int(os.getenv("REDIS_PORT", 6379))
+    password = password or os.getenv("REDIS_PASSWORD")
+
+    key = (host, port, db, password, decode_responses)
+
+    with _pools_lock:
+        pool = _async_pools.get(key)
+        if pool is None:
+            pool = aioredis.BlockingConnectionPool(
+                host=host,
+                port=port,
+                db=db,
+                password=password,
+                decode_responses=decode_responses,
+                **_CONNECTION_SETTINGS
+            )
+            _async_pools[key] = pool
+        return pool
+
+
+def get_async_client(decode_responses: bool = True, **kwargs) -> aioredis.Redis:
+    """asyncio Redis client backed by the shared async pool for these settings"""
+    return aioredis.Redis(connection_pool=get_async_pool(decode_responses, **kwargs))
+
+
+class AutoPipeline(AsyncCoreCommands):
+    """
+    Coalesce commands issued in the same event-loop tick into one pipeline
+
+    Exposes the usual async command methods (get, incr, evalsha, ...).
+    Each call is queued and awaited; the queue is flushed once the current
+    tick yields, as a single non-transactional pipeline. Concurrent requests
+    therefore share one write and one round-trip instead of each paying
+    their own. Errors are delivered to the command that caused them only.
+    """
+
+    def __init__(self, client: aioredis.Redis, max_batch: int = AUTO_PIPELINE_MAX_BATCH):
+        self.client = client
+        self.max_batch = max_batch
+        self._queue: List[Tuple[tuple, dict, asyncio.Future]] = []
+        self._flush_scheduled = False
+        # The loop only holds weak references to tasks; keep in-flight
+        # flushes alive until they resolve their callers' futures
+        self._flush_tasks: Set[asyncio.Task] = set()
+
+    async def execute_command(self, *args, **options):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((args, options, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._schedule_flush)
+        return await future
+
+    def _schedule_flush(self):
+        self._flush_scheduled = False
+        while self._queue:
+            batch = self._queue[:self.max_batch]
+            del self._queue[:self.max_batch]
+            task = asyncio.ensure_future(self._flush(batch))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self, batch: List[Tuple[tuple, dict, asyncio.Future]]):
+        pipe = self.client.pipeline(transaction=False)
+        for args, options, _ in batch:
+            pipe.execute_command(*args, **options)
+        try:
+            results = await pipe.execute(raise_on_error=False)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -7,15 +7,22 @@ Supports API keys and JWT tokens
 
 from fastapi import Security, HTTPException, status
 from fastapi.security import APIKeyHeader, HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 import jwt
 from datetime import datetime, timedelta, timezone
+import asyncio
 import hashlib
+import hmac
+import re
 import secrets
-import redis
-from functools import wraps
+import threading
+import time
+from redis.commands.core import Script
+from functools import wraps, lru_cache
 import os
 
+from scalability.redis_pool import get_client
+
 # Try to import bcrypt
 try:
     import bcrypt
@@ -34,8 +41,33 @@ if not SECRET_KEY:
     print("⚠️  Set JWT_SECRET_KEY environment variable for production!")
 
 ALGORITHM = "HS256"
+# Pre-encoded so PyJWT doesn't re-encode the str key on every call
+_JWT_KEY_BYTES = SECRET_KEY.encode()
+_JWT_ALGORITHMS = [ALGORITHM]
+_JWT_DECODE_OPTIONS = {"require": ["exp"]}
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
 
+# Key metadata expires after this long without use (refreshed on each request)
+API_KEY_IDLE_TTL = int(os.getenv("API_KEY_IDLE_TTL_DAYS", 365)) * 86400
+
+# bcrypt work factor for new keys. Keys are 256-bit random tokens, so bcrypt
+# only guards against offline use of a leaked Redis dump, not guessing of
+# weak secrets; 10 (~4x cheaper than the library default 12) is ample.
+# Existing hashes keep the cost they were created with.
+BCRYPT_COST = int(os.getenv("BCRYPT_COST", 10))
+
+# How long a successful bcrypt verification is trusted (0 disables)
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", 30))
+_AUTH_CACHE_MAX_ENTRIES = 10000
+
+# Well-formed key: "tr_" + secrets.token_urlsafe(32) (43 url-safe chars)
+_API_KEY_RE = re.compile(r"^tr_[A-Za-z0-9_-]{32,}$")
+
+# Prefixes with no stored metadata are remembered briefly so repeated bad
+# keys (scanners) are rejected without a Redis round-trip
+_UNKNOWN_PREFIX_TTL = 60
+_UNKNOWN_PREFIX_MAX_ENTRIES = 1024
+
 # =============================================================================
 # RAILWAY DEPLOYMENT FIX: Parse REDIS_URL before connecting
 # =============================================================================
@@ -59,13 +91,9 @@ configure_redis_from_url()
 
 # Redis for API key storage - with graceful fallback
 try:
-    redis_client = redis.Redis(
-        host=os.getenv("REDIS_HOST", "localhost"),
-        port=int(os.getenv("REDIS_PORT", 6379)),
-        password=os.getenv("REDIS_PASSWORD"),
-        decode_responses=True,
-        socket_connect_timeout=5
-    )
+    # No client-side caching: every validation bumps usage in api_key_meta,
+    # so a tracked read would be invalidated right after each request
+    redis_client = get_client(decode_responses=True)
     redis_client.ping()
     REDIS_AVAILABLE = True
     print(f"✅ Redis connected: {os.getenv('REDIS_HOST')}:{os.getenv('REDIS_PORT')}")
@@ -74,6 +102,73 @@ except Exception as e:
     REDIS_AVAILABLE = False
     print(f"⚠️  Redis not available: {e}")
 
+# (epoch second, ISO string) of the last _iso_now() call; one tuple so
+# concurrent readers never see a mismatched pair
+_now_cache = (0, "")
+
+
+def _iso_now() -> str:
+    """
+    Current UTC time as ISO 8601, second resolution
+    
+    Rebuilt at most once per second; calls within the same second reuse
+    the cached string instead of constructing and formatting a datetime.
+    """
+    global _now_cache
+    now = int(time.time())
+    cached_at, iso = _now_cache
+    if now != cached_at:
+        iso = datetime.fromtimestamp(now, timezone.utc).isoformat()
+        _now_cache = (now, iso)
+    return iso
+
+
+# Pre-encoded key prefixes: redis-py passes bytes keys through without
+# re-encoding, so hot-path keys are built as bytes once
+_META_PREFIX = b"api_key_meta:"
+_USER_KEYS_PREFIX = b"user_keys:"
+
+
+def _meta_key(prefix: str) -> bytes:
+    """Redis key for an API key's metadata hash"""
+    return _META_PREFIX + prefix.encode()
+
+
+def _user_keys_key(user_id: str) -> bytes:
+    """Redis key for a user's set of key prefixes"""
+    return _USER_KEYS_PREFIX + user_id.encode()
+
+
+# Metadata fields returned by get_user_keys (order matters)
+_KEY_INFO_FIELDS = ("tier", "created_at", "last_used", "total_requests")
+
+
+# Server-side scripts (EVALSHA, reloaded automatically on NOSCRIPT).
+# Bound to no client so tests can swap redis_client; the client is passed per call.
+
+# Usage bump after a successful verification: one atomic round-trip
+# KEYS[1] = api_key_meta:<prefix>; ARGV = last_used, idle TTL
+_USAGE_SCRIPT = Script(None, b"""
+local k = KEYS[1]
+redis.call('HINCRBY', k, 'requests_today', 1)
+redis.call('HINCRBY', k, 'total_requests', 1)
+redis.call('HSET', k, 'last_used', ARGV[1])
+redis.call('EXPIRE', k, ARGV[2])
+return 1
+""")
+
+# Revocation: look up owner, delete metadata and unindex in one call
+# KEYS[1] = api_key_meta:<prefix>; ARGV = user_keys: prefix, key prefix
+# (the user_keys key is derived in-script, so this assumes a single,
+# non-clustered Redis as everywhere else in this module)
+_REVOKE_SCRIPT = Script(None, b"""
+local uid = redis.call('HGET', KEYS[1], 'user_id')
+if not uid then return 0 end
+redis.call('DEL', KEYS[1])
+redis.call('SREM', ARGV[1] .. uid, ARGV[2])
+return 1
+""")
+
 # Security schemes
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 bearer_scheme = HTTPBearer(auto_error=False)
@@ -91,7 +186,7 @@ def hash_api_key(api_key: str) -> str:
     """
     if not BCRYPT_AVAILABLE:
         raise RuntimeError("bcrypt not installed")
-    return bcrypt.hashpw(api_key.encode(), bcrypt.gensalt()).decode()
+    return bcrypt.hashpw(api_key.encode(), bcrypt.gensalt(rounds=BCRYPT_COST)).decode()
 
 
 def verify_api_key_hash(api_key: str, hashed: str) -> bool:
@@ -113,6 +208,96 @@ def verify_api_key_hash(api_key: str, hashed: str) -> bool:
         return False
 
 
+# prefix -> (stored bcrypt hash, SHA-256 of plain key, expiry)
+_auth_cache: Dict[str, tuple] = {}
+_auth_cache_lock = threading.Lock()
+
+
+def _verified_recently(prefix: str, api_key: str, stored_hash: str) -> bool:
+    """
+    True if this exact key was bcrypt-verified against stored_hash within
+    AUTH_CACHE_TTL seconds
+    
+    The stored hash is re-read from Redis on every request, so a rotated or
+    revoked key stops matching immediately.
+    """
+    with _auth_cache_lock:
+        entry = _auth_cache.get(prefix)
+    
+    if entry is None:
+        return False
+    
+    cached_hash, key_digest, expires_at = entry
+    if time.monotonic() >= expires_at or cached_hash != stored_hash:
+        return False
+    
+    return hmac.compare_digest(key_digest, hashlib.sha256(api_key.encode()).digest())
+
+
+def _remember_verified(prefix: str, api_key: str, stored_hash: str):
+    """Record a successful bcrypt verification"""
+    if AUTH_CACHE_TTL <= 0:
+        return
+    
+    entry = (
+        stored_hash,
+        hashlib.sha256(api_key.encode()).digest(),
+        time.monotonic() + AUTH_CACHE_TTL
+    )
+    with _auth_cache_lock:
+        if len(_auth_cache) >= _AUTH_CACHE_MAX_ENTRIES:
+            _auth_cache.clear()
+        _auth_cache[prefix] = entry
+
+
+def _forget_verified(prefix: str):
+    """Drop a cached verification (rotate/revoke)"""
+    with _auth_cache_lock:
+        _auth_cache.pop(prefix, None)
+
+
+# prefix -> expiry, for prefixes that had no metadata in Redis
+_unknown_prefixes: Dict[str, float] = {}
+_unknown_prefixes_lock = threading.Lock()
+
+
+def _is_known_unknown(prefix: str) -> bool:
+    """True if prefix recently had no metadata in Redis"""
+    with _unknown_prefixes_lock:
+        expires_at = _unknown_prefixes.get(prefix)
+    return expires_at is not None and time.monotonic() < expires_at
+
+
+def _remember_unknown(prefix: str):
+    """Record a prefix that had no metadata in Redis"""
+    with _unknown_prefixes_lock:
+        if len(_unknown_prefixes) >= _UNKNOWN_PREFIX_MAX_ENTRIES:
+            _unknown_prefixes.clear()
+        _unknown_prefixes[prefix] = time.monotonic() + _UNKNOWN_PREFIX_TTL
+
+
+def _forget_unknown(prefix: str):
+    """Drop a negative entry (a key with this prefix was just created)"""
+    with _unknown_prefixes_lock:
+        _unknown_prefixes.pop(prefix, None)
+
+
+@lru_cache(maxsize=4096)
+def _prefix_for(key_head: str) -> str:
+    """SHA-256 lookup prefix for the first 16 chars of a key (memoized)"""
+    return hashlib.sha256(key_head.encode()).hexdigest()[:16]
+
+
+def key_prefix(api_key: str) -> str:
+    """
+    Lookup prefix for an API key
+    
+    The same key is re-validated on every request, so the hash of its
+    first 16 chars is memoized.
+    """
+    return _prefix_for(api_key[:16])
+
+
 class APIKeyManager:
     """Manage API keys - SECURE VERSION with bcrypt hashing"""
     
@@ -130,6 +315,26 @@ class APIKeyManager:
         if not BCRYPT_AVAILABLE:
             raise HTTPException(status_code=503, detail="bcrypt not available")
         
+        plain_key, prefix, key_data = APIKeyManager._new_key(user_id, tier)
+        
+        # Store metadata and index it under the user in one round-trip
+        pipe = redis_client.pipeline(transaction=True)
+        APIKeyManager._queue_store(pipe, prefix, key_data)
+        pipe.execute()
+        _forget_unknown(prefix)
+        
+        # Return PLAIN key (user sees this once and must save it)
+        return plain_key
+    
+    @staticmethod
+    async def generate_api_key_async(user_id: str, tier: str = "free") -> str:
+        """generate_api_key in a worker thread so bcrypt doesn't block the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, APIKeyManager.generate_api_key, user_id, tier)
+    
+    @staticmethod
+    def _new_key(user_id: str, tier: str) -> Tuple[str, str, Dict]:
+        """Generate a plain key plus its lookup prefix and metadata (HASHED key)"""
         # Generate plain key
         plain_key = f"tr_{secrets.token_urlsafe(32)}"
         
@@ -137,28 +342,28 @@ class APIKeyManager:
         hashed_key = hash_api_key(plain_key)
         
         # Create lookup index: hash of first 16 chars for fast lookup
-        key_prefix = hashlib.sha256(plain_key[:16].encode()).hexdigest()[:16]
+        prefix = key_prefix(plain_key)
         
-        # Store metadata with HASHED key
+        now_iso = _iso_now()
         key_data = {
             "user_id": user_id,
             "tier": tier,
             "hashed_key": hashed_key,
-            "key_prefix": key_prefix,
-            "created_at": datetime.now(timezone.utc).isoformat(),
+            "key_prefix": prefix,
+            "created_at": now_iso,
             "requests_today": 0,
             "total_requests": 0,
-            "last_rotated": datetime.now(timezone.utc).isoformat()
+            "last_rotated": now_iso
         }
-        
-        # Store by prefix for lookup
-        redis_client.hset(f"api_key_meta:{key_prefix}", mapping=key_data)
-        
-        # Add to user's key list (store prefix only)
-        redis_client.sadd(f"user_keys:{user_id}", key_prefix)
-        
-        # Return PLAIN key (user sees this once and must save it)
-        return plain_key
+        return plain_key, prefix, key_data
+    
+    @staticmethod
+    def _queue_store(pipe, prefix: str, key_data: Dict):
+        """Queue metadata write (with idle TTL) and user index on a pipeline"""
+        meta_key = _meta_key(prefix)
+        pipe.hset(meta_key, mapping=key_data)
+        pipe.expire(meta_key, API_KEY_IDLE_TTL)
+        pipe.sadd(_user_keys_key(key_data['user_id']), prefix)
     
     @staticmethod
     def validate_api_key(api_key: str) -> Optional[Dict]:
@@ -167,29 +372,41 @@ class APIKeyManager:
         
         1. Extract prefix from plain key
         2. Look up metadata by prefix
-        3. Verify against bcrypt hash
+        3. Verify against bcrypt hash (skipped if verified within AUTH_CACHE_TTL)
         """
-        if not REDIS_AVAILABLE or not api_key or not api_key.startswith("tr_"):
+        # Reject malformed keys before any hashing or Redis work
+        if not REDIS_AVAILABLE or not api_key or not _API_KEY_RE.match(api_key):
             return None
         
         # Get key prefix for lookup
-        key_prefix = hashlib.sha256(api_key[:16].encode()).hexdigest()[:16]
+        prefix = key_prefix(api_key)
+        if _is_known_unknown(prefix):
+            return None
+        meta_key = _meta_key(prefix)
         
         # Get metadata
-        key_data = redis_client.hgetall(f"api_key_meta:{key_prefix}")
+        key_data = redis_client.hgetall(meta_key)
         
         if not key_data:
+            _remember_unknown(prefix)
             return None
         
         # Verify hash
         stored_hash = key_data.get("hashed_key")
-        if not stored_hash or not verify_api_key_hash(api_key, stored_hash):
+        if not stored_hash:
             return None
         
-        # Increment usage
-        redis_client.hincrby(f"api_key_meta:{key_prefix}", "requests_today", 1)
-        redis_client.hincrby(f"api_key_meta:{key_prefix}", "total_requests", 1)
-        redis_client.hset(f"api_key_meta:{key_prefix}", "last_used", datetime.now(timezone.utc).isoformat())
+        if not _verified_recently(prefix, api_key, stored_hash):
+            if not verify_api_key_hash(api_key, stored_hash):
+                return None
+            _remember_verified(prefix, api_key, stored_hash)
+        
+        # Increment usage (one atomic round-trip)
+        _USAGE_SCRIPT(
+            keys=[meta_key],
+            args=[_iso_now(), API_KEY_IDLE_TTL],
+            client=redis_client
+        )
         
         return key_data
     
@@ -211,34 +428,44 @@ class APIKeyManager:
         user_id = old_key_data.get("user_id")
         tier = old_key_data.get("tier")
         
-        # Generate new key
-        new_key = APIKeyManager.generate_api_key(user_id, tier)
+        if not BCRYPT_AVAILABLE:
+            raise HTTPException(status_code=503, detail="bcrypt not available")
+        
+        new_key, new_prefix, new_key_data = APIKeyManager._new_key(user_id, tier)
+        old_prefix = key_prefix(old_api_key)
+        _forget_verified(old_prefix)
         
-        # Revoke old key
-        old_prefix = hashlib.sha256(old_api_key[:16].encode()).hexdigest()[:16]
-        redis_client.delete(f"api_key_meta:{old_prefix}")
-        redis_client.srem(f"user_keys:{user_id}", old_prefix)
+        # Store new key and revoke old key atomically
+        pipe = redis_client.pipeline(transaction=True)
+        APIKeyManager._queue_store(pipe, new_prefix, new_key_data)
+        pipe.delete(_meta_key(old_prefix))
+        pipe.srem(_user_keys_key(user_id), old_prefix)
+        pipe.execute()
+        _forget_unknown(new_prefix)
         
         return new_key
     
+    @staticmethod
+    async def rotate_api_key_async(old_api_key: str) -> str:
+        """rotate_api_key in a worker thread so bcrypt doesn't block the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, APIKeyManager.rotate_api_key, old_api_key)
+    
     @staticmethod
     def revoke_api_key(api_key: str) -> bool:
         """Revoke an API key"""
         if not REDIS_AVAILABLE:
             return False
         
-        key_prefix = hashlib.sha256(api_key[:16].encode()).hexdigest()[:16]
-        key_data = redis_client.hgetall(f"api_key_meta:{key_prefix}")
+        prefix = key_prefix(api_key)
+        _forget_verified(prefix)
         
-        if not key_data:
-            return False
-        
-        user_id = key_data.get("user_id")
-        
-        redis_client.delete(f"api_key_meta:{key_prefix}")
-        redis_client.srem(f"user_keys:{user_id}", key_prefix)
-        
-        return True
+        revoked = _REVOKE_SCRIPT(
+            keys=[_meta_key(prefix)],
+            args=[_USER_KEYS_PREFIX, prefix],
+            client=redis_client
+        )
+        return bool(revoked)
     
     @staticmethod
     def get_user_keys(user_id: str) -> list:
@@ -246,26 +473,40 @@ class APIKeyManager:
         if not REDIS_AVAILABLE:
             return []
         
-        prefixes = list(redis_client.smembers(f"user_keys:{user_id}"))
+        user_keys_key = _user_keys_key(user_id)
+        prefixes = list(redis_client.smembers(user_keys_key))
+        if not prefixes:
+            return []
         
-        # Return metadata for each key
-        keys_info = []
+        # Fetch only the returned fields for every key in one round-trip
+        pipe = redis_client.pipeline(transaction=False)
         for prefix in prefixes:
-            key_data = redis_client.hgetall(f"api_key_meta:{prefix}")
-            if key_data:
-                keys_info.append({
-                    "prefix": prefix,
-                    "tier": key_data.get("tier"),
-                    "created_at": key_data.get("created_at"),
-                    "last_used": key_data.get("last_used", "never"),
-                    "total_requests": key_data.get("total_requests", 0)
-                })
+            pipe.hmget(_meta_key(prefix), _KEY_INFO_FIELDS)
+        rows = pipe.execute()
+        
+        keys_info = []
+        expired = []
+        for prefix, (tier, created_at, last_used, total_requests) in zip(prefixes, rows):
+            if tier is None:
+                # Metadata expired (idle TTL); drop the dangling index entry
+                expired.append(prefix)
+                continue
+            keys_info.append({
+                "prefix": prefix,
+                "tier": tier,
+                "created_at": created_at,
+                "last_used": last_used or "never",
+                "total_requests": total_requests or 0
+            })
+        
+        if expired:
+            redis_client.srem(user_keys_key, *expired)
         
         return keys_info
 
 
 class JWTManager:
-    """Manage JWT tokens - with timezone-aware datetime"""
+    """Manage JWT tokens - expiry as integer epoch seconds (UTC)"""
     
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -273,20 +514,26 @@ class JWTManager:
         to_encode = data.copy()
         
         if expires_delta:
-            expire = datetime.now(timezone.utc) + expires_delta
+            lifetime = int(expires_delta.total_seconds())
         else:
-            expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+            lifetime = ACCESS_TOKEN_EXPIRE_MINUTES * 60
         
-        to_encode.update({"exp": expire})
+        # NumericDate per RFC 7519; what PyJWT would derive from a datetime
+        to_encode["exp"] = int(time.time()) + lifetime
         
-        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        encoded_jwt = jwt.encode(to_encode, _JWT_KEY_BYTES, algorithm=ALGORITHM)
         return encoded_jwt
     
     @staticmethod
     def verify_token(token: str) -> Optional[Dict]:
         """Verify and decode JWT token"""
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            payload = jwt.decode(
+                token,
+                _JWT_KEY_BYTES,
+                algorithms=_JWT_ALGORITHMS,
+                options=_JWT_DECODE_OPTIONS
+            )
             return payload
         except jwt.ExpiredSignatureError:
             return None
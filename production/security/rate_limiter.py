@@ -5,51 +5,239 @@ Implements sliding window algorithm for accurate rate limiting
 """
 
 from fastapi import HTTPException, status, Request
-from typing import Optional, Tuple
-import redis
+from typing import Dict, Optional, Tuple
+import asyncio
+import itertools
 import time
-from datetime import datetime, timedelta
-import hashlib
 import os
 
+from redis.commands.core import Script
+from redis.exceptions import NoScriptError
+
+from scalability.redis_pool import AutoPipeline, get_async_client, get_client
+from security.usage_quotas import utc_day
+
 # Redis connection with graceful fallback
 try:
-    redis_client = redis.Redis(
-        host=os.getenv("REDIS_HOST", "localhost"),
-        port=int(os.getenv("REDIS_PORT", 6379)),
-        decode_responses=True,
-        socket_connect_timeout=5
-    )
+    redis_client = get_client(decode_responses=True)
     redis_client.ping()
     REDIS_AVAILABLE = True
 except:
     redis_client = None
     REDIS_AVAILABLE = False
 
+# How long a system load reading is reused by AdaptiveRateLimiter
+SYSTEM_LOAD_TTL = 0.5
+
+# Checks run on the event loop: commands from concurrent requests issued in
+# the same tick are sent as one pipeline. Replies are only ever integers, so
+# skip str decoding (raw bytes pool; hiredis parses RESP when installed).
+async_redis_client = AutoPipeline(get_async_client(decode_responses=False)) if REDIS_AVAILABLE else None
+
+# Sliding window decision in one atomic EVALSHA round-trip. The set is capped
+# at the limit by rank instead of being trimmed by score: below the cap the
+# request is allowed; at the cap it is allowed only if the oldest entry has
+# left the window, which is then dropped. Rejected requests are never logged,
+# so each key holds at most max_requests entries whatever the window length.
+# The returned count is the set size, which may include entries already
+# outside the window while under the cap.
+_WINDOW_CHECK_LUA = b"""
+local function window_check(key, window_start, limit)
+    local n = redis.call('ZCARD', key)
+    if n > limit then
+        redis.call('ZREMRANGEBYRANK', key, 0, n - limit - 1)
+        n = limit
+    end
+    if n < limit then
+        return n, true
+    end
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')[2]
+    if oldest and tonumber(oldest) <= window_start then
+        redis.call('ZREMRANGEBYRANK', key, 0, 0)
+        return n - 1, true
+    end
+    return n, false
+end
+"""
+
+# KEYS[1] = window key; ARGV = window start (us), now (us), limit, ttl, member
+# Only the SHA is used; RateLimiter._run_script loads the body on NOSCRIPT.
+SLIDING_WINDOW_LUA = _WINDOW_CHECK_LUA + b"""
+local n, allowed = window_check(KEYS[1], tonumber(ARGV[1]), tonumber(ARGV[3]))
+if allowed then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[5])
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+return {n, allowed and 1 or 0}
+"""
+_SLIDING_WINDOW_SCRIPT = Script(None, SLIDING_WINDOW_LUA)
+
+# Sliding window and daily counter in one call. The request is counted
+# against both only if both allow it.
+# KEYS = window key, daily key
+# ARGV = window start (us), now (us), limit, window ttl, member, daily limit, daily ttl
+# (keys share a slot only by accident, so this assumes a single, non-clustered
+# Redis as everywhere else in this module)
+ALL_LIMITS_LUA = _WINDOW_CHECK_LUA + b"""
+local n, allowed = window_check(KEYS[1], tonumber(ARGV[1]), tonumber(ARGV[3]))
+local day = tonumber(redis.call('GET', KEYS[2]) or '0')
+local day_allowed = day < tonumber(ARGV[6])
+if allowed and day_allowed then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[5])
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+    day = redis.call('INCR', KEYS[2])
+    if redis.call('TTL', KEYS[2]) < 0 then
+        redis.call('EXPIRE', KEYS[2], ARGV[7])
+    end
+end
+return {n, allowed and 1 or 0, day, day_allowed and 1 or 0}
+"""
+_ALL_LIMITS_SCRIPT = Script(None, ALL_LIMITS_LUA)
+
+# Fixed-window and daily counters: count and set the expiry on first use in
+# one atomic call, so a counter can never be left without a TTL.
+# KEYS[1] = counter key; ARGV[1] = ttl (s)
+COUNTER_LUA = b"""
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return count
+"""
+_COUNTER_SCRIPT = Script(None, COUNTER_LUA)
+
+# Window entries are integer microsecond timestamps (score) and the same
+# timestamp shifted left with a 10-bit sequence in the low bits (member), so
+# small sets stay listpack-encoded with integer members. The sequence starts
+# at a random offset per process so workers rarely collide in the same us.
+_MEMBER_SEQ_BITS = 10
+_MEMBER_SEQ_MASK = (1 << _MEMBER_SEQ_BITS) - 1
+_member_seq = itertools.count(int.from_bytes(os.urandom(2), "little"))
+
+
+def _window_member(now_us: int) -> int:
+    """Unique sorted-set member for a request at now_us"""
+    return (now_us << _MEMBER_SEQ_BITS) | (next(_member_seq) & _MEMBER_SEQ_MASK)
+
+
+# Window strategies for check_rate_limit:
+#   sliding - exact rolling window, one sorted-set entry per request
+#   fixed   - one counter per window bucket, O(1) memory, may admit up to
+#             2x the limit across a bucket boundary
+RATE_LIMIT_STRATEGIES = ("sliding", "fixed")
+
+# Once a key is over its limit, repeat requests within this many seconds are
+# rejected from memory instead of costing a Redis round-trip each (per worker)
+DENY_CACHE_SECONDS = 1.0
+_DENY_CACHE_MAX_ENTRIES = 10000
+
+# window key and limit -> (deny until, info returned on the rejection)
+_deny_until: Dict[str, Tuple[float, dict]] = {}
+
+
+def _cached_denial(key: str, now: float) -> Optional[dict]:
+    """Info of a recent rejection for key, if it is still in force"""
+    entry = _deny_until.get(key)
+    if entry is None:
+        return None
+    if now >= entry[0]:
+        del _deny_until[key]
+        return None
+    return entry[1]
+
+
+def _remember_denial(key: str, now: float, reset: float, info: dict):
+    """Short-circuit key for a moment after a rejection (never past its reset)"""
+    if len(_deny_until) >= _DENY_CACHE_MAX_ENTRIES:
+        # Evict the oldest entry (dicts keep insertion order)
+        del _deny_until[next(iter(_deny_until))]
+    _deny_until[key] = (min(now + DENY_CACHE_SECONDS, reset), info)
+
 
 class RateLimiter:
     """Advanced rate limiter using Redis"""
     
-    def __init__(self):
-        self.redis = redis_client
+    def __init__(self, strategy: str = "sliding"):
+        if strategy not in RATE_LIMIT_STRATEGIES:
+            raise ValueError(f"Unknown rate limit strategy: {strategy}")
+        self.redis = async_redis_client
         self.enabled = REDIS_AVAILABLE
+        self.strategy = strategy
     
     def _get_identifier(self, request: Request, user_data: dict) -> str:
         """Get unique identifier for rate limiting"""
+        # Several limiters may run on one request; work it out once
+        identifier = getattr(request.state, "rate_limit_identifier", None)
+        if identifier is not None:
+            return identifier
+        
         # Prefer API key, fallback to IP
         if user_data:
-            return f"user:{user_data.get('user_id', 'unknown')}"
-        
-        # Get client IP (handle proxies)
-        forwarded = request.headers.get("X-Forwarded-For")
-        if forwarded:
-            client_ip = forwarded.split(",")[0].strip()
+            identifier = f"user:{user_data.get('user_id', 'unknown')}"
         else:
-            client_ip = request.client.host if request.client else "unknown"
+            # Get client IP (handle proxies)
+            forwarded = request.headers.get("X-Forwarded-For")
+            if forwarded:
+                client_ip = forwarded.partition(",")[0].strip()
+            else:
+                client_ip = request.client.host if request.client else "unknown"
+            identifier = f"ip:{client_ip}"
         
-        return f"ip:{client_ip}"
+        request.state.rate_limit_identifier = identifier
+        return identifier
+    
+    async def _run_script(self, script: Script, keys: list, args: list):
+        """EVALSHA a module-level script, loading it first if the server lost it"""
+        try:
+            return await self.redis.evalsha(script.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            await self.redis.script_load(script.script)
+            return await self.redis.evalsha(script.sha, len(keys), *keys, *args)
+    
+    async def _sliding_window(
+        self,
+        key: str,
+        now: float,
+        max_requests: int,
+        window_seconds: int
+    ) -> Tuple[int, bool]:
+        """
+        Run the sliding window script for one key
+
+        Returns:
+            (requests already in the window, allowed)
+        """
+        now_us = int(now * 1_000_000)
+        current_requests, allowed = await self._run_script(
+            _SLIDING_WINDOW_SCRIPT,
+            keys=[key],
+            args=[
+                now_us - window_seconds * 1_000_000, now_us, max_requests,
+                window_seconds * 2, _window_member(now_us)
+            ]
+        )
+        return int(current_requests), bool(allowed)
     
-    def check_rate_limit(
+    async def _fixed_window(
+        self,
+        key: str,
+        now: float,
+        max_requests: int,
+        window_seconds: int
+    ) -> Tuple[int, bool, int]:
+        """
+        Count the request in the current fixed window bucket
+
+        Returns:
+            (requests already in the window, allowed, reset timestamp)
+        """
+        bucket = int(now // window_seconds)
+        count = await self._run_script(
+            _COUNTER_SCRIPT, keys=[f"{key}:{bucket}"], args=[window_seconds * 2]
+        )
+        return count - 1, count <= max_requests, (bucket + 1) * window_seconds
+    
+    async def check_rate_limit(
         self,
         request: Request,
         user_data: Optional[dict] = None,
@@ -69,39 +257,33 @@ class RateLimiter:
         identifier = self._get_identifier(request, user_data)
         key = f"rate_limit:{identifier}:{window_seconds}"
         
-        now = time.time()
-        window_start = now - window_seconds
-        
-        # Use Redis sorted set for sliding window
-        pipe = self.redis.pipeline()
+        # A denial only holds for the same limit on the same key
+        denial_key = f"{key}:{max_requests}"
         
-        # Remove old entries
-        pipe.zremrangebyscore(key, 0, window_start)
-        
-        # Count current requests
-        pipe.zcard(key)
-        
-        # Add current request
-        pipe.zadd(key, {str(now): now})
-        
-        # Set expiry
-        pipe.expire(key, window_seconds * 2)
-        
-        results = pipe.execute()
-        current_requests = results[1]
+        now = time.time()
+        denied = _cached_denial(denial_key, now)
+        if denied is not None:
+            return False, denied
         
-        allowed = current_requests < max_requests
+        if self.strategy == "fixed":
+            current_requests, allowed, reset = await self._fixed_window(key, now, max_requests, window_seconds)
+        else:
+            current_requests, allowed = await self._sliding_window(key, now, max_requests, window_seconds)
+            reset = int(now + window_seconds)
         
         info = {
             "limit": max_requests,
             "remaining": max(0, max_requests - current_requests - 1),
-            "reset": int(now + window_seconds),
+            "reset": reset,
             "current": current_requests
         }
         
+        if not allowed:
+            _remember_denial(denial_key, now, reset, info)
+        
         return allowed, info
     
-    def check_daily_limit(
+    async def check_daily_limit(
         self,
         request: Request,
         user_data: Optional[dict] = None,
@@ -112,18 +294,15 @@ class RateLimiter:
             return True, {"limit": max_requests, "remaining": max_requests, "reset_date": "", "current": 0}
             
         identifier = self._get_identifier(request, user_data)
-        today = datetime.now().strftime("%Y-%m-%d")
+        today, midnight, _ = utc_day()
         key = f"daily_limit:{identifier}:{today}"
         
-        current_count = self.redis.incr(key)
+        # Expire at end of day (UTC, same as usage quotas)
+        seconds_until_midnight = midnight - int(time.time())
         
-        if current_count == 1:
-            # Set expiry to end of day
-            seconds_until_midnight = (
-                datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time()) 
-                - datetime.now()
-            ).seconds
-            self.redis.expire(key, seconds_until_midnight)
+        current_count = await self._run_script(
+            _COUNTER_SCRIPT, keys=[key], args=[max(1, seconds_until_midnight)]
+        )
         
         allowed = current_count <= max_requests
         
@@ -136,7 +315,77 @@ class RateLimiter:
         
         return allowed, info
     
-    def check_endpoint_limit(
+    async def check_all_limits(
+        self,
+        request: Request,
+        user_data: Optional[dict] = None,
+        max_requests: int = 60,
+        window_seconds: int = 60,
+        max_daily: int = 10000
+    ) -> Tuple[Tuple[bool, dict], Tuple[bool, dict]]:
+        """
+        Check the per-window and daily limits together
+        
+        With the sliding strategy both are decided by one script call, and a
+        request rejected by either limit is counted against neither. The
+        request is allowed only if both results are.
+        
+        Returns:
+            ((allowed, info) as check_rate_limit, (allowed, info) as check_daily_limit)
+        """
+        if not self.enabled or self.strategy == "fixed":
+            # Auto-pipelined, so still a single round-trip
+            window, daily = await asyncio.gather(
+                self.check_rate_limit(request, user_data, max_requests, window_seconds),
+                self.check_daily_limit(request, user_data, max_daily)
+            )
+            return window, daily
+        
+        identifier = self._get_identifier(request, user_data)
+        key = f"rate_limit:{identifier}:{window_seconds}"
+        today, midnight, _ = utc_day()
+        daily_key = f"daily_limit:{identifier}:{today}"
+        denial_key = f"{key}:{max_requests}|{daily_key}:{max_daily}"
+        
+        now = time.time()
+        denied = _cached_denial(denial_key, now)
+        if denied is not None:
+            return denied["window"], denied["daily"]
+        
+        now_us = int(now * 1_000_000)
+        current_requests, allowed, current_count, daily_allowed = await self._run_script(
+            _ALL_LIMITS_SCRIPT,
+            keys=[key, daily_key],
+            args=[
+                now_us - window_seconds * 1_000_000, now_us, max_requests,
+                window_seconds * 2, _window_member(now_us),
+                max_daily, max(1, midnight - int(now))
+            ]
+        )
+        
+        reset = int(now + window_seconds)
+        info = {
+            "limit": max_requests,
+            "remaining": max(0, max_requests - current_requests - 1),
+            "reset": reset,
+            "current": current_requests
+        }
+        daily_info = {
+            "limit": max_daily,
+            "remaining": max(0, max_daily - current_count),
+            "reset_date": today,
+            "current": current_count
+        }
+        results = (bool(allowed), info), (bool(daily_allowed), daily_info)
+        
+        if not allowed:
+            _remember_denial(denial_key, now, reset, {"window": results[0], "daily": results[1]})
+        elif not daily_allowed:
+            _remember_denial(denial_key, now, midnight, {"window": results[0], "daily": results[1]})
+        
+        return results
+    
+    async def check_endpoint_limit(
         self,
         request: Request,
         endpoint: str,
@@ -144,34 +393,38 @@ class RateLimiter:
         max_requests: int = 10,
         window_seconds: int = 60
     ) -> Tuple[bool, dict]:
-        """Check rate limit per endpoint"""
+        """
+        Check rate limit per endpoint
+        
+        Always uses fixed windows: endpoint limits are small and coarse,
+        so a counter per bucket is accurate enough and much cheaper.
+        """
         if not self.enabled:
             return True, {"endpoint": endpoint, "limit": max_requests, "remaining": max_requests, "reset": 0}
             
         identifier = self._get_identifier(request, user_data)
         key = f"endpoint_limit:{identifier}:{endpoint}:{window_seconds}"
         
-        now = time.time()
-        window_start = now - window_seconds
-        
-        pipe = self.redis.pipeline()
-        pipe.zremrangebyscore(key, 0, window_start)
-        pipe.zcard(key)
-        pipe.zadd(key, {str(now): now})
-        pipe.expire(key, window_seconds * 2)
+        # A denial only holds for the same limit on the same key
+        denial_key = f"{key}:{max_requests}"
         
-        results = pipe.execute()
-        current_requests = results[1]
+        now = time.time()
+        denied = _cached_denial(denial_key, now)
+        if denied is not None:
+            return False, denied
         
-        allowed = current_requests < max_requests
+        current_requests, allowed, reset = await self._fixed_window(key, now, max_requests, window_seconds)
         
         info = {
             "endpoint": endpoint,
             "limit": max_requests,
             "remaining": max(0, max_requests - current_requests - 1),
-            "reset": int(now + window_seconds)
+            "reset": reset
         }
         
+        if not allowed:
+            _remember_denial(denial_key, now, reset, info)
+        
         return allowed, info
 
 
@@ -188,21 +441,31 @@ class AdaptiveRateLimiter(RateLimiter):
             "pro": 200,
             "enterprise": 1000
         }
+        # (monotonic read time, load)
+        self._load_cache: Tuple[float, float] = (float("-inf"), 0.0)
     
-    def get_system_load(self) -> float:
-        """Get current system load (0.0 to 1.0)"""
+    async def get_system_load(self) -> float:
+        """Get current system load (0.0 to 1.0), re-read at most every SYSTEM_LOAD_TTL"""
         if not self.enabled:
             return 0.0
+        
+        read_at, load = self._load_cache
+        now = time.monotonic()
+        if now - read_at <= SYSTEM_LOAD_TTL:
+            return load
+        
         # Check Redis for current active requests
-        active_requests = int(self.redis.get("active_requests") or 0)
+        active_requests = int(await self.redis.get("active_requests") or 0)
         max_capacity = 100  # Configure based on your system
         
-        return min(active_requests / max_capacity, 1.0)
+        load = min(active_requests / max_capacity, 1.0)
+        self._load_cache = (now, load)
+        return load
     
-    def get_adaptive_limit(self, tier: str) -> int:
+    async def get_adaptive_limit(self, tier: str) -> int:
         """Get rate limit adjusted for system load"""
         base_limit = self.base_limits.get(tier, 10)
-        load = self.get_system_load()
+        load = await self.get_system_load()
         
         # Reduce limits under high load
         if load > 0.9:
@@ -217,24 +480,53 @@ class AdaptiveRateLimiter(RateLimiter):
         return int(base_limit * multiplier)
 
 
+# Shared instances: limiters hold no per-request state
+_DEFAULT_LIMITER = RateLimiter()
+_ADAPTIVE_LIMITER = AdaptiveRateLimiter()
+
+
 def rate_limit_middleware(
     max_requests: int = 60,
-    window_seconds: int = 60
+    window_seconds: int = 60,
+    daily_max: Optional[int] = None
 ):
     """
     Decorator for rate limiting endpoints
+    
+    With daily_max set, the daily limit is enforced too, in the same
+    Redis call as the window check.
     """
     def decorator(func):
         async def wrapper(request: Request, *args, **kwargs):
-            limiter = RateLimiter()
+            limiter = _DEFAULT_LIMITER
             
             # Get user data from request state (set by auth middleware)
             user_data = getattr(request.state, "user", None)
             
             # Check rate limit
-            allowed, info = limiter.check_rate_limit(
-                request, user_data, max_requests, window_seconds
-            )
+            if daily_max is None:
+                allowed, info = await limiter.check_rate_limit(
+                    request, user_data, max_requests, window_seconds
+                )
+            else:
+                (allowed, info), (daily_allowed, daily_info) = await limiter.check_all_limits(
+                    request, user_data, max_requests, window_seconds, daily_max
+                )
+                if allowed and not daily_allowed:
+                    raise HTTPException(
+                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                        detail={
+                            "error": "Daily limit exceeded",
+                            "limit": daily_info["limit"],
+                            "remaining": daily_info["remaining"],
+                            "reset_date": daily_info["reset_date"]
+                        },
+                        headers={
+                            "X-RateLimit-Limit": str(daily_info["limit"]),
+                            "X-RateLimit-Remaining": str(daily_info["remaining"]),
+                            "Retry-After": str(max(1, utc_day()[1] - int(time.time())))
+                        }
+                    )
             
             if not allowed:
                 raise HTTPException(
@@ -5,20 +5,18 @@ Hard limits on daily usage with billing integration hooks
 """
 
 from typing import Dict, Tuple
-import os
-from datetime import datetime, timezone, timedelta
+import time
 import logging
 
+from redis.commands.core import Script
+
+from scalability.redis_pool import get_client
+
 logger = logging.getLogger(__name__)
 
-# Try to import redis
+# Quotas are only enforced while the Redis server is reachable
 try:
-    import redis
-    redis_client = redis.Redis(
-        host=os.getenv("REDIS_HOST", "localhost"),
-        port=int(os.getenv("REDIS_PORT", 6379)),
-        decode_responses=True
-    )
+    redis_client = get_client(decode_responses=True)
     redis_client.ping()
     REDIS_AVAILABLE = True
 except Exception:
@@ -56,6 +54,58 @@ DAILY_QUOTAS = {
 }
 
 
+# Usage bump with server-side threshold detection: one atomic round-trip.
+# Reports only the increment that crosses 80% / 100%, so concurrent callers
+# can't both see the same transition.
+# KEYS[1] = daily usage hash; ARGV = resource, amount, quota, ttl
+# Bound to no client so tests can swap redis_client; the client is passed per call.
+_INCREMENT_SCRIPT = Script(None, b"""
+local amount = tonumber(ARGV[2])
+local quota = tonumber(ARGV[3])
+local n = redis.call('HINCRBY', KEYS[1], ARGV[1], amount)
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+local prev = n - amount
+local warn_at = quota * 0.8
+local warned = prev < warn_at and n >= warn_at and n < quota
+local exceeded = prev < quota and n >= quota
+return {n, warned and 1 or 0, exceeded and 1 or 0}
+""")
+
+
+def _usage_key(user_id: str, today: str) -> str:
+    """Hash of one user's usage for one day (field per resource)"""
+    return f"quota:{user_id}:{today}"
+
+
+# (day number, "YYYY-MM-DD", next midnight epoch, next midnight ISO) for the
+# current UTC day. Quota keys and resets are per UTC day; rebuilt only when
+# the day number changes so the hot path does integer math only.
+_day_cache: Tuple[int, str, int, str] = (-1, "", 0, "")
+
+
+def utc_day() -> Tuple[str, int, str]:
+    """
+    Current UTC day
+
+    Returns:
+        (date string, epoch seconds of next midnight, next midnight as ISO 8601)
+    """
+    global _day_cache
+    day = int(time.time()) // 86400
+    if day != _day_cache[0]:
+        midnight = (day + 1) * 86400
+        _day_cache = (day, _utc_date_str(day * 86400), midnight, _utc_date_str(midnight) + "T00:00:00+00:00")
+    return _day_cache[1], _day_cache[2], _day_cache[3]
+
+
+def _utc_date_str(epoch: int) -> str:
+    """YYYY-MM-DD of a UTC timestamp (no datetime objects)"""
+    g = time.gmtime(epoch)
+    return "%04d-%02d-%02d" % (g.tm_year, g.tm_mon, g.tm_mday)
+
+
 class UsageQuotaManager:
     """Enforce usage quotas with billing hooks"""
     
@@ -78,26 +128,20 @@ class UsageQuotaManager:
         quotas = DAILY_QUOTAS.get(tier, DAILY_QUOTAS["free"])
         max_quota = quotas.get(resource, 0)
         
-        # Get usage key
-        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        usage_key = f"quota:{user_id}:{resource}:{today}"
-        
         # Get current usage
-        current_usage = int(redis_client.get(usage_key) or 0)
+        today, _, reset_at = utc_day()
+        current_usage = int(redis_client.hget(_usage_key(user_id, today), resource) or 0)
         
         # Check quota
         allowed = current_usage < max_quota
         remaining = max(0, max_quota - current_usage)
         
-        # Calculate reset time (midnight UTC)
-        tomorrow = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-        
         info = {
             "resource": resource,
             "quota": max_quota,
             "used": current_usage,
             "remaining": remaining,
-            "reset_at": tomorrow.isoformat()
+            "reset_at": reset_at
         }
         
         return allowed, info
@@ -121,47 +165,46 @@ class UsageQuotaManager:
         if not REDIS_AVAILABLE:
             return
         
-        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        usage_key = f"quota:{user_id}:{resource}:{today}"
-        
-        # Increment
-        new_usage = redis_client.incrby(usage_key, amount)
+        today, midnight, _ = utc_day()
         
-        # Set expiry to end of day + buffer (if first increment)
-        if new_usage == amount:
-            # Expire at midnight UTC + 1 hour buffer
-            tomorrow = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1, hours=1)
-            seconds_until_expiry = int((tomorrow - datetime.now(timezone.utc)).total_seconds())
-            redis_client.expire(usage_key, seconds_until_expiry)
+        # Expire at midnight UTC + 1 hour buffer
+        seconds_until_expiry = midnight + 3600 - int(time.time())
         
-        # Check if approaching limit (80%)
         quotas = DAILY_QUOTAS.get(tier, DAILY_QUOTAS["free"])
         max_quota = quotas.get(resource, 0)
         
+        # Increment, set the day's TTL once and check thresholds
+        new_usage, crossed_warning, crossed_quota = _INCREMENT_SCRIPT(
+            keys=[_usage_key(user_id, today)],
+            args=[resource, amount, max_quota, seconds_until_expiry],
+            client=redis_client
+        )
+        
         if max_quota > 0:
-            if new_usage >= max_quota * 0.8 and new_usage < max_quota:
+            # Approaching limit (crossed 80%)
+            if crossed_warning:
                 logger.warning(
                     f"User {user_id} approaching quota limit: {new_usage}/{max_quota} {resource}"
                 )
                 # TODO: Send warning email/webhook
                 UsageQuotaManager._send_quota_warning(user_id, tier, resource, new_usage, max_quota)
             
-            # Check if exceeded
-            if new_usage >= max_quota:
+            # Exceeded (crossed 100%)
+            if crossed_quota:
                 logger.error(f"User {user_id} EXCEEDED quota: {new_usage}/{max_quota} {resource}")
                 # TODO: Send limit exceeded notification
                 UsageQuotaManager._send_quota_exceeded(user_id, tier, resource, new_usage, max_quota)
     
     @staticmethod
     def _send_quota_warning(user_id: str, tier: str, resource: str, usage: int, quota: int):
-        """Send quota warning (80% threshold)"""
+        """Send quota warning (80% threshold; once per user/resource/day, on the crossing)"""
         # TODO: Integrate with email service or webhook
         # Example: send_email(user_id, f"You've used {usage}/{quota} {resource}")
         pass
     
     @staticmethod
     def _send_quota_exceeded(user_id: str, tier: str, resource: str, usage: int, quota: int):
-        """Send quota exceeded notification"""
+        """Send quota exceeded notification (once per user/resource/day, on the crossing)"""
         # TODO: Integrate with email service or webhook
         # Example: send_email(user_id, f"Quota exceeded for {resource}")
         pass
@@ -172,13 +215,15 @@ class UsageQuotaManager:
         if not REDIS_AVAILABLE:
             return {"error": "Redis not available"}
         
-        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        today, _, _ = utc_day()
         quotas = DAILY_QUOTAS.get(tier, DAILY_QUOTAS["free"])
         
+        # All counters live in one hash
+        usages = redis_client.hgetall(_usage_key(user_id, today))
+        
         summary = {}
         for resource, max_quota in quotas.items():
-            usage_key = f"quota:{user_id}:{resource}:{today}"
-            current_usage = int(redis_client.get(usage_key) or 0)
+            current_usage = int(usages.get(resource) or 0)
             
             summary[resource] = {
                 "quota": max_quota,
@@ -191,4 +236,4 @@ class UsageQuotaManager:
 
 
 # Export
-__all__ = ['UsageQuotaManager', 'DAILY_QUOTAS']
+__all__ = ['UsageQuotaManager', 'DAILY_QUOTAS', 'utc_day']
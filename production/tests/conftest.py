@@ -11,7 +11,7 @@ import pytest
 import sys
 import os
 from typing import Generator
-from unittest.mock import MagicMock, AsyncMock
+from unittest.mock import MagicMock, AsyncMock, patch
 
 # Add production folder to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -39,14 +39,14 @@ def test_config():
     }
 
 
-# =============================================================================
-# MODULE-SCOPED FIXTURES
-# =============================================================================
-
-@pytest.fixture(scope="module")
+@pytest.fixture(scope="session")
 def api_client():
     """
-    FastAPI test client - shared across tests in a module
+    FastAPI test client - app startup/shutdown runs once per session
+
+    The client (and its lifespan and transport) is shared by every test:
+    pass headers per request instead of setting client.headers/cookies,
+    and don't add dependency_overrides without removing them again.
     """
     from fastapi.testclient import TestClient
     from api import app
@@ -55,10 +55,43 @@ def api_client():
         yield client
 
 
+@pytest.fixture(scope="session")
+def openapi_schema():
+    """OpenAPI schema built once, in-process (FastAPI caches it on the app)"""
+    from api import app
+    return app.openapi()
+
+
+@pytest.fixture(scope="session")
+def auth_manager():
+    """Shared AuthManager (stateless, safe to reuse)"""
+    from security.auth import AuthManager
+    return AuthManager()
+
+
 # =============================================================================
 # FUNCTION-SCOPED FIXTURES (created fresh for each test)
 # =============================================================================
 
+@pytest.fixture(autouse=True)
+def no_model_loading(request):
+    """
+    Fail the API's lazy model loading fast unless marked requires_model
+
+    Endpoint tests only exercise auth and validation; if one ever got past
+    them, the lazy loader would otherwise pull multi-GB Whisper/NLLB weights.
+    With this in place the API answers 503 instead.
+    """
+    if "api_client" not in request.fixturenames or request.node.get_closest_marker("requires_model"):
+        yield
+        return
+    with patch(
+        "scalability.async_translator.AsyncRealtimeTranslator.load_models",
+        AsyncMock(side_effect=RuntimeError("model loading is disabled in tests"))
+    ):
+        yield
+
+
 @pytest.fixture
 def mock_redis():
     """Mock Redis client for tests without Redis dependency"""
@@ -87,6 +120,17 @@ def mock_redis():
     return mock
 
 
+@pytest.fixture
+def mock_async_redis():
+    """Mock asyncio Redis client (as used by the rate limiter)"""
+    mock = AsyncMock()
+    mock.get.return_value = None
+    mock.set.return_value = True
+    mock.incr.return_value = 1
+    mock.evalsha.return_value = [5, 1]
+    return mock
+
+
 @pytest.fixture
 def mock_translator():
     """Mock AsyncRealtimeTranslator for tests without ML models"""
@@ -116,7 +160,7 @@ def sample_audio_data():
     return np.zeros(16000, dtype=np.float32)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_translation_request():
     """Sample translation request payload"""
     return {
@@ -126,13 +170,13 @@ def sample_translation_request():
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def valid_api_key_header(test_config):
     """Headers with valid API key"""
     return {"X-API-Key": test_config["test_api_key"]}
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def invalid_api_key_header():
     """Headers with invalid API key"""
     return {"X-API-Key": "invalid_key"}
@@ -162,3 +206,12 @@ def pytest_configure(config):
     config.addinivalue_line("markers", "slow: Slow tests (model loading, etc.)")
     config.addinivalue_line("markers", "requires_redis: Tests that require Redis")
     config.addinivalue_line("markers", "requires_gpu: Tests that require GPU")
+    config.addinivalue_line("markers", "requires_model: Tests that load real Whisper/NLLB weights")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Keep the FastAPI app (and its model/Redis setup) out of non-integration tests"""
+    skip_app = pytest.mark.skip(reason="api_client is only available to integration tests")
+    for item in items:
+        if "api_client" in getattr(item, "fixturenames", ()) and item.get_closest_marker("integration") is None:
+            item.add_marker(skip_app)
@@ -6,6 +6,7 @@ Test Fixtures: Audio Samples
 Provides sample audio data for testing transcription endpoints.
 """
 
+import struct
 import numpy as np
 from typing import Tuple
 
@@ -44,8 +45,23 @@ def generate_sine_wave(
         Numpy array of audio samples
     """
     num_samples = int(duration_seconds * sample_rate)
-    t = np.linspace(0, duration_seconds, num_samples, dtype=np.float32)
-    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+    audio = np.empty(num_samples, dtype=np.float32)
+    _sine(audio, frequency, sample_rate)
+    audio *= np.float32(amplitude)
+    return audio
+
+
+def _sine(out: np.ndarray, frequency: float, sample_rate: int) -> np.ndarray:
+    """
+    Fill out with sin(2*pi*frequency*t) in place (float32 throughout)
+    
+    The phase step per sample is computed once, so no float64 time or
+    phase arrays are allocated.
+    """
+    out[:] = np.arange(out.size, dtype=np.float32)
+    out *= np.float32(2 * np.pi * frequency / sample_rate)
+    np.sin(out, out=out)
+    return out
 
 
 def generate_white_noise(
@@ -86,32 +102,45 @@ def generate_speech_like_audio(
         Numpy array mimicking speech patterns
     """
     num_samples = int(duration_seconds * sample_rate)
-    t = np.linspace(0, duration_seconds, num_samples, dtype=np.float32)
     
-    # Mix of fundamental frequencies typical in speech
+    # Mix of fundamental frequencies typical in speech, accumulated in place
     audio = np.zeros(num_samples, dtype=np.float32)
-    
-    # Fundamental (100-300 Hz)
-    audio += 0.3 * np.sin(2 * np.pi * 150 * t)
-    
-    # First formant (500-1000 Hz)
-    audio += 0.2 * np.sin(2 * np.pi * 700 * t)
-    
-    # Second formant (1000-2500 Hz)
-    audio += 0.15 * np.sin(2 * np.pi * 1500 * t)
-    
-    # Add amplitude modulation to simulate speech rhythm
-    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)  # ~4 Hz modulation
-    audio *= envelope
+    scratch = np.empty(num_samples, dtype=np.float32)
+    
+    for frequency, amplitude in (
+        (150, 0.3),    # Fundamental (100-300 Hz)
+        (700, 0.2),    # First formant (500-1000 Hz)
+        (1500, 0.15),  # Second formant (1000-2500 Hz)
+    ):
+        _sine(scratch, frequency, sample_rate)
+        scratch *= np.float32(amplitude)
+        audio += scratch
+    
+    # Add amplitude modulation to simulate speech rhythm (~4 Hz)
+    _sine(scratch, 4, sample_rate)
+    scratch *= np.float32(0.5)
+    scratch += np.float32(0.5)
+    audio *= scratch
     
     # Normalize
-    max_val = np.abs(audio).max()
+    max_val = max(audio.max(), -audio.min()) if num_samples else 0
     if max_val > 0:
-        audio = audio / max_val * 0.8
+        audio *= np.float32(0.8 / max_val)
     
     return audio
 
 
+def _wav_header(num_samples: int, sample_rate: int = 16000) -> bytes:
+    """44-byte RIFF header for mono 16-bit PCM with num_samples samples"""
+    data_size = num_samples * 2
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b'data', data_size
+    )
+
+
 def audio_to_bytes(audio: np.ndarray, sample_rate: int = 16000) -> bytes:
     """
     Convert numpy audio array to WAV bytes
@@ -123,20 +152,10 @@ def audio_to_bytes(audio: np.ndarray, sample_rate: int = 16000) -> bytes:
     Returns:
         WAV file as bytes
     """
-    import io
-    import wave
-    
-    # Convert to 16-bit PCM
-    audio_int16 = (audio * 32767).astype(np.int16)
-    
-    buffer = io.BytesIO()
-    with wave.open(buffer, 'wb') as wav:
-        wav.setnchannels(1)
-        wav.setsampwidth(2)  # 16-bit
-        wav.setframerate(sample_rate)
-        wav.writeframes(audio_int16.tobytes())
+    # Convert to 16-bit PCM (little-endian, as WAV requires)
+    audio_int16 = (audio * 32767).astype('<i2')
     
-    return buffer.getvalue()
+    return _wav_header(len(audio_int16), sample_rate) + audio_int16.tobytes()
 
 
 # Pre-generated samples for quick access
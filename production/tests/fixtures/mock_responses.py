@@ -6,9 +6,13 @@ Test Fixtures: Mock Responses
 Provides mock response data for testing API interactions.
 """
 
+import itertools
 from datetime import datetime
 from typing import Dict, Any
 
+# Sequence for generated request IDs: unique, unlike same-microsecond timestamps
+_request_ids = itertools.count(1)
+
 
 # =============================================================================
 # TRANSLATION RESPONSES
@@ -214,7 +218,7 @@ def create_translation_response(
         "source_language": source_lang,
         "target_language": target_lang,
         "cached": cached,
-        "request_id": f"req-{datetime.now().timestamp()}",
+        "request_id": f"req-{next(_request_ids)}",
         "timestamp": datetime.now().isoformat()
     }
 
@@ -229,6 +233,6 @@ def create_error_response(
         "error": error,
         "message": message,
         "status_code": status_code,
-        "request_id": f"err-{datetime.now().timestamp()}",
+        "request_id": f"err-{next(_request_ids)}",
         "timestamp": datetime.now().isoformat()
     }
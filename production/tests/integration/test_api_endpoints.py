@@ -8,25 +8,27 @@ These tests use TestClient to make real HTTP requests.
 """
 
 import pytest
-import sys
-import os
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-
-class TestHealthEndpoints:
-    """Tests for health check endpoints"""
+class TestGetEndpoints:
+    """Shape checks shared by the read-only JSON endpoints"""
     
     @pytest.mark.integration
-    def test_root_endpoint(self, api_client):
-        """GET / should return welcome message"""
-        response = api_client.get("/")
+    @pytest.mark.parametrize("path,expected_keys", [
+        ("/", {"name", "version", "features"}),
+        ("/health", {"overall_status", "checks", "timestamp"}),
+        ("/metrics", {"translator", "cache", "circuit_breakers", "rate_limiting"}),
+    ])
+    def test_get_endpoint(self, api_client, path, expected_keys):
+        """GET should return 200 and a JSON object with the expected keys"""
+        response = api_client.get(path)
         
         assert response.status_code == 200
-        data = response.json()
-        assert "name" in data
-        assert "version" in data
-        assert "features" in data
+        assert expected_keys <= response.json().keys()
+
+
+class TestHealthEndpoints:
+    """Tests for health check endpoints"""
     
     @pytest.mark.integration
     def test_health_simple(self, api_client):
@@ -38,27 +40,14 @@ class TestHealthEndpoints:
         assert data["status"] in ["ok", "healthy"]
     
     @pytest.mark.integration
-    def test_health_detailed(self, api_client):
-        """GET /health should return detailed status"""
-        response = api_client.get("/health")
+    def test_health_live(self, api_client):
+        """GET /health/live should return a liveness aggregate"""
+        response = api_client.get("/health/live")
         
-        assert response.status_code == 200
+        assert response.status_code in [200, 503]
         data = response.json()
-        # Health check returns either 'status' or 'overall_status'
-        assert "status" in data or "overall_status" in data or "checks" in data
-
-
-class TestMetricsEndpoint:
-    """Tests for metrics endpoint"""
-    
-    @pytest.mark.integration
-    def test_metrics_returns_data(self, api_client):
-        """GET /metrics should return metrics data"""
-        response = api_client.get("/metrics")
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert "translator" in data or "cache" in data
+        assert "overall_status" in data
+        assert "checks" in data
 
 
 class TestLanguagesEndpoint:
@@ -82,30 +71,27 @@ class TestDocumentation:
     """Tests for API documentation endpoints"""
     
     @pytest.mark.integration
-    def test_openapi_json(self, api_client):
-        """GET /v1/openapi.json should return OpenAPI schema"""
-        response = api_client.get("/v1/openapi.json")
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert "openapi" in data
-        assert "paths" in data
-        assert "info" in data
+    def test_openapi_json(self, openapi_schema):
+        """The OpenAPI schema should be complete and cover the public routes"""
+        assert "openapi" in openapi_schema
+        assert "info" in openapi_schema
+        assert "/translate/text" in openapi_schema["paths"]
     
     @pytest.mark.integration
     def test_docs_page(self, api_client):
-        """GET /docs should return Swagger UI"""
-        response = api_client.get("/docs")
+        """/docs should serve the Swagger UI shell (HEAD: no body needed)"""
+        response = api_client.head("/docs")
         
         assert response.status_code == 200
         assert "text/html" in response.headers["content-type"]
     
     @pytest.mark.integration
     def test_redoc_page(self, api_client):
-        """GET /redoc should return ReDoc UI"""
-        response = api_client.get("/redoc")
+        """/redoc should serve the ReDoc shell (HEAD: no body needed)"""
+        response = api_client.head("/redoc")
         
         assert response.status_code == 200
+        assert "text/html" in response.headers["content-type"]
 
 
 class TestTranslationEndpoint:
@@ -7,10 +7,26 @@ Tests for complete authentication workflows.
 """
 
 import pytest
-import sys
-import os
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import patch
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import bcrypt
+import jwt
+
+from security.auth import (
+    ALGORITHM,
+    API_KEY_IDLE_TTL,
+    SECRET_KEY,
+    _REVOKE_SCRIPT,
+    _USAGE_SCRIPT,
+    APIKeyManager,
+    JWTManager,
+    get_rate_limit,
+    hash_api_key,
+    key_prefix,
+)
 
 
 class TestAPIKeyAuthentication:
@@ -19,8 +35,6 @@ class TestAPIKeyAuthentication:
     @pytest.mark.integration
     def test_api_key_format(self):
         """API keys should have correct format"""
-        from security.auth import APIKeyManager
-        
         # Valid key format: tr_<random>
         valid_key = "tr_abc123xyz456"
         invalid_key = "abc123xyz456"
@@ -29,28 +43,183 @@ class TestAPIKeyAuthentication:
         assert not invalid_key.startswith("tr_")
     
     @pytest.mark.integration
-    def test_api_key_validation_rejects_invalid(self):
-        """Invalid API keys should be rejected"""
-        from security.auth import APIKeyManager
+    @pytest.mark.parametrize("api_key", ["invalid_key", "", None, "abc123xyz456"])
+    def test_api_key_rejected(self, api_key):
+        """Invalid, empty, missing and unprefixed API keys should be rejected"""
+        assert APIKeyManager.validate_api_key(api_key) is None
+
+
+@pytest.fixture
+def stored_key(mock_redis):
+    """A plain API key whose bcrypt hash is served by mock Redis"""
+    plain_key = "tr_" + "k" * 43
+    mock_redis.hgetall.return_value = {
+        "user_id": "test_user",
+        "tier": "pro",
+        "hashed_key": bcrypt.hashpw(plain_key.encode(), bcrypt.gensalt(rounds=4)).decode(),
+        "key_prefix": key_prefix(plain_key),
+    }
+    with patch('security.auth.redis_client', mock_redis), \
+         patch('security.auth.REDIS_AVAILABLE', True), \
+         patch.dict('security.auth._auth_cache', clear=True), \
+         patch.dict('security.auth._unknown_prefixes', clear=True):
+        yield plain_key
+
+
+class TestAPIKeyValidation:
+    """Tests for API key validation against stored metadata"""
+    
+    @pytest.mark.integration
+    def test_valid_key_updates_usage_in_one_script(self, stored_key, mock_redis):
+        """Usage counters should be written by a single EVALSHA"""
+        result = APIKeyManager.validate_api_key(stored_key)
         
-        result = APIKeyManager.validate_api_key("invalid_key")
-        assert result is None
+        assert result["user_id"] == "test_user"
+        mock_redis.evalsha.assert_called_once()
+        assert mock_redis.evalsha.call_args[0][0] == _USAGE_SCRIPT.sha
+        mock_redis.hincrby.assert_not_called()
     
     @pytest.mark.integration
-    def test_api_key_validation_rejects_empty(self):
-        """Empty API keys should be rejected"""
-        from security.auth import APIKeyManager
+    def test_wrong_key_rejected(self, stored_key, mock_redis):
+        """A key sharing the prefix but not the hash should be rejected"""
+        result = APIKeyManager.validate_api_key(stored_key[:-1] + "x")
         
-        result = APIKeyManager.validate_api_key("")
         assert result is None
+        mock_redis.evalsha.assert_not_called()
     
     @pytest.mark.integration
-    def test_api_key_validation_rejects_none(self):
-        """None API keys should be rejected"""
-        from security.auth import APIKeyManager
+    @pytest.mark.parametrize("api_key", ["tr_short", "tr_" + "k" * 40 + "!", "xx_" + "k" * 43])
+    def test_malformed_key_never_reaches_redis(self, stored_key, mock_redis, api_key):
+        """Keys that can't have been issued should be rejected without a lookup"""
+        assert APIKeyManager.validate_api_key(api_key) is None
+        mock_redis.hgetall.assert_not_called()
+    
+    @pytest.mark.integration
+    def test_unknown_prefix_remembered(self, stored_key, mock_redis):
+        """A prefix with no metadata should not be looked up again right away"""
+        mock_redis.hgetall.return_value = {}
+        unknown_key = "tr_" + "u" * 43
         
-        result = APIKeyManager.validate_api_key(None)
-        assert result is None
+        APIKeyManager.validate_api_key(unknown_key)
+        APIKeyManager.validate_api_key(unknown_key)
+        
+        assert mock_redis.hgetall.call_count == 1
+    
+    @pytest.mark.integration
+    def test_repeat_validation_skips_bcrypt(self, stored_key):
+        """A recently verified key should not be re-checked with bcrypt"""
+        APIKeyManager.validate_api_key(stored_key)
+        with patch('security.auth.verify_api_key_hash') as verify:
+            result = APIKeyManager.validate_api_key(stored_key)
+        
+        assert result is not None
+        verify.assert_not_called()
+    
+    @pytest.mark.integration
+    def test_changed_hash_forces_bcrypt(self, stored_key, mock_redis):
+        """A rotated stored hash should invalidate the cached verification"""
+        APIKeyManager.validate_api_key(stored_key)
+        mock_redis.hgetall.return_value = dict(
+            mock_redis.hgetall.return_value, hashed_key="$2b$04$rotated"
+        )
+        
+        assert APIKeyManager.validate_api_key(stored_key) is None
+
+
+class TestAPIKeyLifecycle:
+    """Tests for key generation, rotation and revocation writes"""
+    
+    @pytest.mark.integration
+    def test_generate_writes_in_one_transaction(self, mock_redis):
+        """Metadata, TTL and user index should go out in one pipeline"""
+        with patch('security.auth.redis_client', mock_redis), \
+             patch('security.auth.REDIS_AVAILABLE', True), \
+             patch('security.auth.hash_api_key', return_value="hashed"):
+            plain_key = APIKeyManager.generate_api_key("test_user", "pro")
+        
+        pipe = mock_redis.pipeline.return_value
+        mock_redis.pipeline.assert_called_once_with(transaction=True)
+        assert pipe.expire.call_args[0][1] == API_KEY_IDLE_TTL
+        pipe.sadd.assert_called_once()
+        pipe.execute.assert_called_once()
+        assert plain_key.startswith("tr_")
+    
+    @pytest.mark.integration
+    def test_hash_uses_configured_cost(self):
+        """New hashes should carry BCRYPT_COST"""
+        with patch('security.auth.BCRYPT_COST', 5):
+            hashed = hash_api_key("tr_" + "k" * 43)
+        
+        assert hashed.split("$")[2] == "05"
+    
+    @pytest.mark.integration
+    async def test_generate_async_runs_off_loop(self, mock_redis):
+        """Async generation should run the sync body in a worker thread"""
+        seen = {}
+        
+        def fake_generate(user_id, tier):
+            seen['thread'] = threading.get_ident()
+            return "tr_new"
+        
+        with patch.object(APIKeyManager, 'generate_api_key', side_effect=fake_generate):
+            assert await APIKeyManager.generate_api_key_async("u1", "pro") == "tr_new"
+        
+        assert seen['thread'] != threading.get_ident()
+    
+    @pytest.mark.integration
+    def test_revoke_in_one_script(self, stored_key, mock_redis):
+        """Revocation should look up, delete and unindex in one EVALSHA"""
+        mock_redis.evalsha.return_value = 1
+        
+        assert APIKeyManager.revoke_api_key(stored_key) is True
+        
+        assert mock_redis.evalsha.call_args[0][0] == _REVOKE_SCRIPT.sha
+        mock_redis.hgetall.assert_not_called()
+        mock_redis.delete.assert_not_called()
+    
+    @pytest.mark.integration
+    def test_revoke_unknown_key(self, stored_key, mock_redis):
+        """Revoking a key with no metadata should report False"""
+        mock_redis.evalsha.return_value = 0
+        
+        assert APIKeyManager.revoke_api_key(stored_key) is False
+
+
+class TestUserKeyListing:
+    """Tests for listing a user's key metadata"""
+    
+    @pytest.mark.integration
+    def test_lists_keys_in_one_pipeline_and_prunes_expired(self, mock_redis):
+        """All HMGETs should share one pipeline; expired entries are unindexed"""
+        mock_redis.smembers.return_value = ["aaaa", "bbbb"]
+        pipe = mock_redis.pipeline.return_value
+        pipe.execute.return_value = [
+            ["pro", "2025-01-01T00:00:00+00:00", None, "7"],
+            [None, None, None, None],
+        ]
+        
+        with patch('security.auth.redis_client', mock_redis), \
+             patch('security.auth.REDIS_AVAILABLE', True):
+            keys = APIKeyManager.get_user_keys("test_user")
+        
+        assert pipe.hmget.call_count == 2
+        assert keys == [{
+            "prefix": "aaaa",
+            "tier": "pro",
+            "created_at": "2025-01-01T00:00:00+00:00",
+            "last_used": "never",
+            "total_requests": "7"
+        }]
+        mock_redis.srem.assert_called_once_with(b"user_keys:test_user", "bbbb")
+        mock_redis.hgetall.assert_not_called()
+
+
+@pytest.fixture(scope="class")
+def sample_token():
+    """One signed access token shared by the read-only JWT tests"""
+    return JWTManager.create_access_token(
+        data={"user_id": "test_user_123", "tier": "enterprise"}
+    )
 
 
 class TestJWTAuthentication:
@@ -59,8 +228,6 @@ class TestJWTAuthentication:
     @pytest.mark.integration
     def test_jwt_token_creation(self):
         """JWT tokens should be creatable"""
-        from security.auth import JWTManager
-        
         # Create token using JWTManager
         token = JWTManager.create_access_token(
             data={"user_id": "test_user", "tier": "pro"}
@@ -71,25 +238,15 @@ class TestJWTAuthentication:
         assert len(token) > 50  # JWT tokens are typically long
     
     @pytest.mark.integration
-    def test_jwt_token_has_three_parts(self):
+    def test_jwt_token_has_three_parts(self, sample_token):
         """JWT tokens should have header.payload.signature format"""
-        from security.auth import JWTManager
-        
-        token = JWTManager.create_access_token(data={"user_id": "test"})
-        
-        parts = token.split(".")
+        parts = sample_token.split(".")
         assert len(parts) == 3
     
     @pytest.mark.integration
-    def test_jwt_token_decoding(self):
+    def test_jwt_token_decoding(self, sample_token):
         """JWT tokens should be decodable"""
-        from security.auth import JWTManager
-        
-        original_data = {"user_id": "test_user_123", "tier": "enterprise"}
-        token = JWTManager.create_access_token(data=original_data)
-        
-        # Decode using verify_token
-        decoded = JWTManager.verify_token(token)
+        decoded = JWTManager.verify_token(sample_token)
         
         assert decoded is not None
         assert decoded.get("user_id") == "test_user_123"
@@ -98,23 +255,48 @@ class TestJWTAuthentication:
     @pytest.mark.integration
     def test_jwt_invalid_token_rejected(self):
         """Invalid JWT tokens should be rejected"""
-        from security.auth import JWTManager
-        
         result = JWTManager.verify_token("invalid.token.here")
         assert result is None
     
     @pytest.mark.integration
-    def test_jwt_tampered_token_rejected(self):
+    def test_jwt_tampered_token_rejected(self, sample_token):
         """Tampered JWT tokens should be rejected"""
-        from security.auth import JWTManager
-        
-        token = JWTManager.create_access_token(data={"user_id": "test"})
-        
-        # Tamper with token
-        tampered = token[:-5] + "XXXXX"
+        tampered = sample_token[:-5] + "XXXXX"
         
         result = JWTManager.verify_token(tampered)
         assert result is None
+    
+    @pytest.mark.integration
+    def test_jwt_expiry_honours_delta(self):
+        """exp should be an epoch second offset by the requested lifetime"""
+        token = JWTManager.create_access_token(
+            data={"user_id": "test"}, expires_delta=timedelta(minutes=5)
+        )
+        exp = JWTManager.verify_token(token)["exp"]
+        
+        assert abs(exp - (time.time() + 300)) <= 2
+    
+    @pytest.mark.integration
+    def test_jwt_expired_token_rejected(self):
+        """Tokens past their expiry should be rejected"""
+        token = JWTManager.create_access_token(
+            data={"user_id": "test"}, expires_delta=timedelta(seconds=-10)
+        )
+        
+        assert JWTManager.verify_token(token) is None
+    
+    @pytest.mark.integration
+    def test_jwt_without_exp_rejected(self):
+        """Tokens without an expiry claim should be rejected"""
+        token = jwt.encode({"user_id": "test"}, SECRET_KEY, algorithm=ALGORITHM)
+        
+        assert JWTManager.verify_token(token) is None
+
+
+@pytest.fixture(scope="module")
+def tier_limits():
+    """Rate limits per tier, in ascending tier order, looked up once"""
+    return {tier: get_rate_limit(tier) for tier in ("free", "basic", "pro", "enterprise")}
 
 
 class TestTierBasedLimits:
@@ -127,39 +309,24 @@ class TestTierBasedLimits:
         ("pro", 100),
         ("enterprise", 500),
     ])
-    def test_tier_limits(self, tier, min_rpm):
+    def test_tier_limits(self, tier_limits, tier, min_rpm):
         """Each tier should have appropriate limits"""
-        from security.auth import get_rate_limit
-        
-        limits = get_rate_limit(tier)
-        
-        assert limits["requests_per_minute"] >= min_rpm
+        assert tier_limits[tier]["requests_per_minute"] >= min_rpm
     
     @pytest.mark.integration
-    def test_tier_limits_increase_with_tier(self):
+    def test_tier_limits_increase_with_tier(self, tier_limits):
         """Higher tiers should have higher limits"""
-        from security.auth import get_rate_limit
-        
-        free = get_rate_limit("free")
-        basic = get_rate_limit("basic")
-        pro = get_rate_limit("pro")
-        enterprise = get_rate_limit("enterprise")
+        rpm = [limits["requests_per_minute"] for limits in tier_limits.values()]
         
-        assert free["requests_per_minute"] < basic["requests_per_minute"]
-        assert basic["requests_per_minute"] < pro["requests_per_minute"]
-        assert pro["requests_per_minute"] < enterprise["requests_per_minute"]
+        assert rpm == sorted(set(rpm))
 
 
 class TestAuthManager:
     """Tests for AuthManager class"""
     
     @pytest.mark.integration
-    def test_auth_manager_instantiation(self):
+    def test_auth_manager_instantiation(self, auth_manager):
         """AuthManager should instantiate correctly"""
-        from security.auth import AuthManager
-        
-        manager = AuthManager()
-        
-        assert manager is not None
-        assert hasattr(manager, 'verify_request')
-        assert hasattr(manager, 'verify_admin')
+        assert auth_manager is not None
+        assert hasattr(auth_manager, 'verify_request')
+        assert hasattr(auth_manager, 'verify_admin')
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Unit Tests: Async Translator
+============================
+
+Tests for scalability/async_translator.py
+These tests cover request coalescing logic without loading any models.
+"""
+
+import pytest
+import asyncio
+import numpy as np
+
+from scalability.async_translator import (
+    AsyncRealtimeTranslator,
+    _EncoderCache,
+    _TranslateBatcher,
+    _length_bucket,
+    _max_new_tokens,
+    _normalize_audio
+)
+
+
+class RecordingBackend:
+    """Fake batch translator that records each call"""
+
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    async def __call__(self, texts, target_language):
+        self.calls.append((list(texts), target_language))
+        if self.error:
+            raise self.error
+        return [f"{target_language}:{text}" for text in texts]
+
+
+class TestTranslateBatcher:
+    """Test micro-batching of concurrent translate requests"""
+
+    @pytest.mark.unit
+    async def test_concurrent_requests_share_one_call(self):
+        """Requests inside the wait window should be translated together"""
+        backend = RecordingBackend()
+        batcher = _TranslateBatcher(backend, max_batch=8, max_wait_ms=20)
+
+        results = await asyncio.gather(
+            *(batcher.submit(f"text {i}", "fra_Latn") for i in range(4))
+        )
+        await batcher.close()
+
+        assert results == [f"fra_Latn:text {i}" for i in range(4)]
+        assert len(backend.calls) == 1
+
+    @pytest.mark.unit
+    async def test_batches_split_by_target_language(self):
+        """Each target language gets its own call"""
+        backend = RecordingBackend()
+        batcher = _TranslateBatcher(backend, max_batch=8, max_wait_ms=20)
+
+        results = await asyncio.gather(
+            batcher.submit("a", "fra_Latn"),
+            batcher.submit("b", "deu_Latn"),
+            batcher.submit("c", "fra_Latn"),
+        )
+        await batcher.close()
+
+        assert results == ["fra_Latn:a", "deu_Latn:b", "fra_Latn:c"]
+        assert sorted(lang for _, lang in backend.calls) == ["deu_Latn", "fra_Latn"]
+
+    @pytest.mark.unit
+    async def test_max_batch_caps_call_size(self):
+        """No call should exceed max_batch texts"""
+        backend = RecordingBackend()
+        batcher = _TranslateBatcher(backend, max_batch=2, max_wait_ms=20)
+
+        await asyncio.gather(*(batcher.submit(str(i), "fra_Latn") for i in range(5)))
+        await batcher.close()
+
+        assert all(len(texts) <= 2 for texts, _ in backend.calls)
+
+    @pytest.mark.unit
+    async def test_errors_reach_every_waiter(self):
+        """A failed batch should raise in each caller"""
+        batcher = _TranslateBatcher(RecordingBackend(error=RuntimeError("oom")), max_wait_ms=20)
+
+        results = await asyncio.gather(
+            batcher.submit("a", "fra_Latn"),
+            batcher.submit("b", "fra_Latn"),
+            return_exceptions=True
+        )
+        await batcher.close()
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.unit
+    async def test_prepare_overlaps_translate(self):
+        """The next batch should be prepared while the current one translates"""
+        events = []
+        translating = asyncio.Event()
+        release = asyncio.Event()
+
+        async def prepare(texts):
+            events.append(("prepare", texts[0]))
+            return texts
+
+        async def translate(texts, target_language):
+            events.append(("translate", texts[0]))
+            if texts[0] == "first":
+                translating.set()
+                await release.wait()
+            return texts
+
+        batcher = _TranslateBatcher(translate, max_wait_ms=1, prepare=prepare)
+        first = asyncio.ensure_future(batcher.submit("first", "fra_Latn"))
+        await translating.wait()
+        second = asyncio.ensure_future(batcher.submit("second", "fra_Latn"))
+        while ("prepare", "second") not in events:
+            await asyncio.sleep(0.001)
+        prepared_while_busy = ("translate", "second") not in events
+        release.set()
+
+        assert await asyncio.gather(first, second) == ["first", "second"]
+        await batcher.close()
+        assert prepared_while_busy
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("n_tokens,bucket", [(1, 64), (64, 64), (65, 128), (300, 512), (900, 512)])
+    def test_length_bucket(self, n_tokens, bucket):
+        """Token counts should map to the smallest fitting bucket"""
+        assert _length_bucket(n_tokens) == bucket
+
+
+class TestGenerationOptions:
+    """Test decode options chosen per batch"""
+
+    @pytest.mark.unit
+    def test_short_inputs_decode_greedily(self):
+        """Short batches should use one beam and no beam options"""
+        kwargs = AsyncRealtimeTranslator(num_beams=4)._generation_kwargs(5)
+
+        assert kwargs['num_beams'] == 1
+        assert 'early_stopping' not in kwargs
+
+    @pytest.mark.unit
+    def test_beam_options_for_longer_inputs(self):
+        """Longer batches should use the configured beam width"""
+        kwargs = AsyncRealtimeTranslator(num_beams=4)._generation_kwargs(40)
+
+        assert kwargs['num_beams'] == 4
+        assert kwargs['early_stopping'] is True
+        assert kwargs['max_new_tokens'] == 80
+
+    @pytest.mark.unit
+    def test_max_new_tokens_capped(self):
+        """Decode budget should stop at the 512-token input truncation length"""
+        assert _max_new_tokens(200) == 400
+        assert _max_new_tokens(500) == 512
+
+
+class TestEncoderCache:
+    """Test LRU cache of encoder outputs"""
+
+    @pytest.mark.unit
+    def test_evicts_least_recently_used(self):
+        """Oldest untouched entry should be evicted first"""
+        cache = _EncoderCache(max_entries=2)
+        cache.put((1,), "a")
+        cache.put((2,), "b")
+        cache.get((1,))
+        cache.put((3,), "c")
+
+        assert cache.get((1,)) == "a"
+        assert cache.get((2,)) is None
+        assert len(cache) == 2
+
+    @pytest.mark.unit
+    def test_zero_size_disables_cache(self):
+        """max_entries=0 should store nothing"""
+        cache = _EncoderCache(max_entries=0)
+        cache.put((1,), "a")
+
+        assert cache.get((1,)) is None
+
+
+class TestNormalizeAudio:
+    """Test audio normalization before transcription"""
+
+    @pytest.mark.unit
+    def test_in_range_float32_is_not_copied(self):
+        """Audio already in [-1, 1] should be passed through as-is"""
+        audio = np.array([0.5, -0.25, 1.0], dtype=np.float32)
+
+        assert _normalize_audio(audio) is audio
+
+    @pytest.mark.unit
+    def test_out_of_range_scaled_by_peak(self):
+        """Loud audio should be scaled so its peak is 1 without touching the input"""
+        audio = np.array([2.0, -4.0, 1.0], dtype=np.float32)
+
+        result = _normalize_audio(audio)
+
+        np.testing.assert_allclose(result, [0.5, -1.0, 0.25])
+        assert audio[1] == -4.0
+
+    @pytest.mark.unit
+    def test_float64_converted_to_float32(self):
+        """Float64 input should come back as float32"""
+        result = _normalize_audio(np.array([3.0, -1.5]))
+
+        assert result.dtype == np.float32
+        np.testing.assert_allclose(result, [1.0, -0.5])
+
+    @pytest.mark.unit
+    def test_int16_scaled_by_full_range(self):
+        """int16 PCM should map full scale to [-1, 1]"""
+        result = _normalize_audio(np.array([16384, -32768], dtype=np.int16))
+
+        assert result.dtype == np.float32
+        np.testing.assert_allclose(result, [0.5, -1.0])
+    
+    @pytest.mark.unit
+    def test_int16_tensor_matches_numpy_path(self):
+        """int16 tensors should use the same fixed scale, not peak normalization"""
+        torch = pytest.importorskip("torch")
+        from scalability.async_translator import _normalize_audio_tensor
+        
+        pcm = np.array([1000, -2000], dtype=np.int16)
+        result = _normalize_audio_tensor(torch.from_numpy(pcm))
+        
+        np.testing.assert_allclose(result.numpy(), _normalize_audio(pcm))
+
+
+class TestTranslateBreaker:
+    """Test circuit breaking around batched translation"""
+
+    @pytest.mark.unit
+    async def test_failed_batch_counts_once(self):
+        """One failed batch should record one failure, not one per caller"""
+        translator = AsyncRealtimeTranslator(batch_wait_ms=20)
+        translator._loaded.set()
+        breaker = translator._generate_batch.circuit_breaker
+        breaker.reset()
+
+        async def tokenize(texts):
+            return texts
+
+        def fail(encoded, tgt_lang):
+            raise RuntimeError("oom")
+
+        translator._batcher._prepare = tokenize
+        translator._translate_batch_sync = fail
+
+        results = await asyncio.gather(
+            *(translator.translate_text(f"text {i}") for i in range(6)),
+            return_exceptions=True
+        )
+        failures = breaker.failure_count
+        breaker.reset()
+        await translator.cleanup()
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert failures == 1
+
+
+class TestRequestStats:
+    """Test request counters maintained by process_audio"""
+
+    @pytest.mark.unit
+    async def test_counters_track_peak_concurrency(self):
+        """Active count should return to zero and the peak should be kept"""
+        translator = AsyncRealtimeTranslator()
+        release = asyncio.Event()
+
+        async def fake_process(audio_data):
+            await release.wait()
+            return "original", "translated"
+
+        translator._process_audio = fake_process
+        tasks = [asyncio.create_task(translator.process_audio(None)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        assert translator.active_requests == 3
+        release.set()
+        await asyncio.gather(*tasks)
+
+        stats = translator.get_stats()
+        assert stats['total_requests'] == 3
+        assert stats['active_requests'] == 0
+        assert stats['max_concurrent_requests'] == 3
+        await translator.cleanup()
+
+    @pytest.mark.unit
+    async def test_batch_bounded_and_ordered(self):
+        """Batch processing should cap concurrency and keep input order"""
+        translator = AsyncRealtimeTranslator(batch_concurrency=2)
+        peak = 0
+
+        async def fake_process(audio_data):
+            nonlocal peak
+            peak = max(peak, translator.active_requests)
+            await asyncio.sleep(0.01)
+            return str(len(audio_data)), ""
+
+        translator._process_audio = fake_process
+        audio_list = [np.zeros(n, dtype=np.float32) for n in (300, 100, 200, 50)]
+
+        results = await translator.process_audio_batch(audio_list)
+
+        assert [original for original, _ in results] == ["300", "100", "200", "50"]
+        assert peak == 2
+        await translator.cleanup()
@@ -5,17 +5,13 @@ Unit Tests: Cache Manager
 
 Tests for scalability/cache_manager.py
 These tests verify caching logic and Redis interactions.
-Now using JSON serialization (secure, no pickle).
+Now using msgpack/JSON serialization (secure, no pickle).
 """
 
 import pytest
-import sys
 import os
-import json
 from unittest.mock import MagicMock, patch
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
 
 class TestCacheManagerBasics:
     """Basic cache manager functionality tests"""
@@ -69,16 +65,16 @@ class TestCacheOperations:
     
     @pytest.mark.unit
     def test_get_with_mock_redis(self, mock_redis):
-        """get() should deserialize cached value (JSON)"""
-        from scalability.cache_manager import CacheManager
+        """get() should deserialize a cached value as written by set()"""
+        from scalability.cache_manager import CacheManager, serialize_value
         
         manager = CacheManager()
         manager.redis_client = mock_redis
         manager.enabled = True
         
-        # Mock Redis returning JSON data (not pickle anymore)
+        # Same tagged msgpack payload set() writes (legacy JSON: TestSerialization)
         test_value = {"text": "Hello", "translation": "Bonjour"}
-        mock_redis.get.return_value = json.dumps(test_value)
+        mock_redis.get.return_value = serialize_value(test_value)
         
         result = manager.get("test_key")
         
@@ -129,6 +125,218 @@ class TestCacheOperations:
         assert manager.sets == 1
 
 
+class TestBatchOperations:
+    """Tests for get_many/set_many round-trip batching"""
+    
+    @pytest.mark.unit
+    def test_get_many_uses_single_mget(self, mock_redis):
+        """get_many() should fetch all keys with one MGET"""
+        from scalability.cache_manager import CacheManager, serialize_value
+        
+        manager = CacheManager()
+        manager.redis_client = mock_redis
+        manager.enabled = True
+        mock_redis.mget.return_value = [serialize_value("Bonjour"), None]
+        
+        result = manager.get_many(["k1", "k2"])
+        
+        mock_redis.mget.assert_called_once_with(["k1", "k2"])
+        assert result == ["Bonjour", None]
+        assert manager.hits == 1
+        assert manager.misses == 1
+    
+    @pytest.mark.unit
+    def test_get_many_error_counts_every_key_as_miss(self, mock_redis):
+        """A failed MGET should return all misses and count each one"""
+        from scalability.cache_manager import CacheManager
+        
+        manager = CacheManager()
+        manager.redis_client = mock_redis
+        manager.enabled = True
+        mock_redis.mget.side_effect = ConnectionError("reset")
+        
+        result = manager.get_many(["k1", "k2", "k3"])
+        
+        assert result == [None, None, None]
+        assert manager.hits == 0
+        assert manager.misses == 3
+    
+    @pytest.mark.unit
+    def test_set_many_uses_one_pipeline(self, mock_redis):
+        """set_many() should queue every SETEX on one pipeline"""
+        from scalability.cache_manager import CacheManager
+        
+        manager = CacheManager()
+        manager.redis_client = mock_redis
+        manager.enabled = True
+        
+        manager.set_many({"k1": "a", "k2": "b"}, ttl=60)
+        
+        pipe = mock_redis.pipeline.return_value
+        mock_redis.pipeline.assert_called_once_with(transaction=False)
+        assert pipe.setex.call_count == 2
+        pipe.execute.assert_called_once()
+        assert manager.sets == 2
+    
+    @pytest.mark.unit
+    def test_get_translations_matches_single_keys(self, mock_redis):
+        """Batched translation lookup should use the same keys as get_translation"""
+        from scalability.cache_manager import CacheManager, TranslationCache
+        
+        manager = CacheManager()
+        manager.redis_client = mock_redis
+        manager.enabled = True
+        mock_redis.mget.return_value = [None, None]
+        tc = TranslationCache(manager)
+        
+        tc.get_translations(["a", "b"], "en", "fr")
+        
+        keys = mock_redis.mget.call_args[0][0]
+        assert keys == [tc._key("a", "en", "fr"), tc._key("b", "en", "fr")]
+
+
+class TestWriteBehind:
+    """Tests for fire-and-forget cache writes"""
+    
+    @pytest.fixture
+    def manager(self, mock_redis):
+        from scalability.cache_manager import CacheManager
+        
+        manager = CacheManager()
+        manager.redis_client = mock_redis
+        manager.enabled = True
+        return manager
+    
+    @pytest.mark.unit
+    async def test_sets_flushed_in_one_pipeline(self, manager, mock_redis):
+        """Queued sets should be written together, not one SETEX each"""
+        import asyncio
+        
+        await manager.start_write_behind(max_wait_ms=20)
+        for i in range(5):
+            manager.set(f"k{i}", f"v{i}", ttl=60)
+        
+        mock_redis.setex.assert_not_called()
+        await asyncio.sleep(0.1)
+        
+        pipe = mock_redis.pipeline.return_value
+        assert pipe.setex.call_count == 5
+        pipe.execute.assert_called_once()
+        assert manager.sets == 5
+        await manager.stop_write_behind()
+    
+    @pytest.mark.unit
+    async def test_full_queue_drops_writes(self, manager):
+        """Writes beyond max_pending should be dropped and counted"""
+        await manager.start_write_behind(max_pending=2, max_wait_ms=1000)
+        for i in range(5):
+            manager.set(f"k{i}", "v")
+        
+        stats = manager.get_stats()
+        await manager.stop_write_behind()
+        
+        assert stats["dropped_writes"] >= 2
+    
+    @pytest.mark.unit
+    async def test_stop_flushes_pending(self, manager, mock_redis):
+        """Stopping should write everything still queued"""
+        await manager.start_write_behind(max_wait_ms=1000)
+        for i in range(3):
+            manager.set(f"k{i}", "v")
+        
+        await manager.stop_write_behind()
+        
+        assert mock_redis.pipeline.return_value.setex.call_count == 3
+        assert manager.sets == 3
+
+
+class TestClearPattern:
+    """Tests for pattern-based cache clearing"""
+    
+    @pytest.mark.unit
+    def test_clear_pattern_unlinks_in_batches(self, mock_redis):
+        """Scanned keys should be unlinked in bounded batches"""
+        from scalability.cache_manager import CacheManager, _DELETE_BATCH_SIZE
+        
+        manager = CacheManager()
+        manager.redis_client = mock_redis
+        manager.enabled = True
+        mock_redis.scan_iter.return_value = iter([f"k{i}" for i in range(_DELETE_BATCH_SIZE + 1)])
+        
+        manager.clear_pattern("translation:*")
+        
+        sizes = [len(call.args) for call in mock_redis.unlink.call_args_list]
+        assert sizes == [_DELETE_BATCH_SIZE, 1]
+        mock_redis.delete.assert_not_called()
+    
+    @pytest.mark.unit
+    def test_clear_pattern_falls_back_to_delete(self, mock_redis):
+        """Servers without UNLINK should get DEL instead"""
+        import redis
+        from scalability.cache_manager import CacheManager
+        
+        manager = CacheManager()
+        manager.redis_client = mock_redis
+        manager.enabled = True
+        mock_redis.scan_iter.return_value = iter(["k1", "k2"])
+        mock_redis.unlink.side_effect = redis.ResponseError("unknown command")
+        
+        manager.clear_pattern("translation:*")
+        
+        mock_redis.delete.assert_called_once_with("k1", "k2")
+
+
+class TestSerialization:
+    """Tests for tagged msgpack/JSON value encoding"""
+    
+    @pytest.mark.unit
+    @pytest.mark.parametrize("value", [
+        "Bonjour",
+        {"text": "Hello", "translation": "Bonjour"},
+        b"raw bytes",
+        {1: "a", 2: {3: "b"}},
+    ])
+    def test_round_trip(self, value):
+        """Values should decode to what was stored"""
+        from scalability.cache_manager import serialize_value, deserialize_value
+        
+        assert deserialize_value(serialize_value(value)) == value
+    
+    @pytest.mark.unit
+    def test_large_values_compressed(self):
+        """Payloads above the threshold should be zstd-compressed"""
+        from scalability.cache_manager import (
+            serialize_value, deserialize_value, _TAG_MSGPACK_ZSTD, ZSTD_AVAILABLE
+        )
+        if not ZSTD_AVAILABLE:
+            pytest.skip("zstandard not installed")
+        
+        value = "bonjour " * 1000
+        serialized = serialize_value(value)
+        
+        assert serialized[:1] == _TAG_MSGPACK_ZSTD
+        assert len(serialized) < len(value)
+        assert deserialize_value(serialized) == value
+    
+    @pytest.mark.unit
+    def test_unsupported_type_falls_back_to_json(self):
+        """Values msgpack can't encode should use tagged JSON"""
+        import numpy as np
+        from scalability.cache_manager import serialize_value, deserialize_value, _TAG_JSON
+        
+        serialized = serialize_value(np.array([1, 2, 3]))
+        
+        assert serialized[:1] == _TAG_JSON
+        assert deserialize_value(serialized).tolist() == [1, 2, 3]
+    
+    @pytest.mark.unit
+    def test_legacy_untagged_json(self):
+        """Untagged values written by older versions should still decode"""
+        from scalability.cache_manager import deserialize_value
+        
+        assert deserialize_value(b'{"text": "Hello"}') == {"text": "Hello"}
+
+
 class TestCacheKeyGeneration:
     """Tests for cache key generation"""
     
@@ -168,6 +376,43 @@ class TestCacheKeyGeneration:
         key = manager._generate_key("translation", data)
         
         assert key.startswith("translation:")
+    
+    @pytest.mark.unit
+    def test_generate_key_dict_order_independent(self):
+        """Dict keys should hash the same regardless of insertion order"""
+        from scalability.cache_manager import CacheManager
+        
+        manager = CacheManager()
+        
+        key1 = manager._generate_key("p", {"a": 1, "b": b"\x00"})
+        key2 = manager._generate_key("p", {"b": b"\x00", "a": 1})
+        
+        assert key1 == key2
+    
+    @pytest.mark.unit
+    def test_key_json_fallback_matches_orjson(self):
+        """Keys should not depend on whether orjson is installed"""
+        from scalability.cache_manager import _key_json, ORJSON_AVAILABLE
+        if not ORJSON_AVAILABLE:
+            pytest.skip("orjson not installed")
+        
+        data = {"text": "안녕 hello", "lang": "ko", "beams": 2, "raw": b"\x00"}
+        fast = _key_json(data)
+        with patch('scalability.cache_manager.ORJSON_AVAILABLE', False):
+            assert _key_json(data) == fast
+    
+    @pytest.mark.unit
+    def test_generate_key_from_tuple(self):
+        """Tuple fields should hash in order to a fixed-width key"""
+        from scalability.cache_manager import CacheManager
+        
+        manager = CacheManager()
+        
+        key1 = manager._generate_key("translation", ("hello", "en", "fr"))
+        key2 = manager._generate_key("translation", ("hello", "fr", "en"))
+        
+        assert key1 != key2
+        assert len(key1.split(":", 1)[1]) == 16
 
 
 class TestCacheStatistics:
@@ -199,6 +444,62 @@ class TestCacheStatistics:
         stats = manager.get_stats()
         
         assert stats["hit_rate"] == 80.0  # 80 / 100 * 100
+    
+    @pytest.mark.unit
+    def test_counters_exact_across_threads(self):
+        """Concurrent misses from many threads should not lose updates"""
+        import threading
+        from scalability.cache_manager import CacheManager
+        
+        manager = CacheManager()
+        manager.enabled = False
+        
+        def worker():
+            for _ in range(1000):
+                manager.get("key")
+        
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert manager.misses == 8000
+    
+    @pytest.mark.unit
+    def test_stats_fetch_only_needed_info_sections(self, mock_redis):
+        """Redis stats should come from the memory and clients sections only"""
+        from scalability.cache_manager import CacheManager
+        
+        manager = CacheManager()
+        manager.redis_client = mock_redis
+        manager.enabled = True
+        pipe = mock_redis.pipeline.return_value
+        pipe.execute.return_value = [{"used_memory": 2 * 1024 * 1024}, {"connected_clients": 3}]
+        
+        stats = manager.get_stats()
+        
+        assert [c.args for c in pipe.info.call_args_list] == [("memory",), ("clients",)]
+        mock_redis.info.assert_not_called()
+        assert stats["redis_memory_used_mb"] == 2.0
+        assert stats["redis_connected_clients"] == 3
+    
+    @pytest.mark.unit
+    def test_stats_warn_on_fragmentation(self, mock_redis, caplog):
+        """A high fragmentation ratio should be reported and logged"""
+        from scalability.cache_manager import CacheManager
+        
+        manager = CacheManager()
+        manager.redis_client = mock_redis
+        manager.enabled = True
+        mock_redis.pipeline.return_value.execute.return_value = [
+            {"used_memory": 0, "mem_fragmentation_ratio": 2.1}, {}
+        ]
+        
+        stats = manager.get_stats()
+        
+        assert stats["redis_fragmentation_ratio"] == 2.1
+        assert "fragmentation" in caplog.text
 
 
 class TestTranslationCache:
@@ -251,3 +552,153 @@ class TestAudioHashing:
         hash2 = hash_audio(b"audio data 2")
         
         assert hash1 != hash2
+    
+    @pytest.mark.unit
+    def test_hash_audio_file_matches_bytes(self):
+        """Hashing a file object should match hashing its bytes"""
+        import io
+        from scalability.cache_manager import hash_audio
+        
+        audio_bytes = os.urandom(3 * 1024 * 1024 + 17)
+        
+        assert hash_audio(io.BytesIO(audio_bytes)) == hash_audio(audio_bytes)
+        assert len(hash_audio(audio_bytes)) == 32
+    
+    @pytest.mark.unit
+    def test_hash_audio_read_only_stream(self):
+        """Streams with read() but no readinto() should still be hashed"""
+        import io
+        from scalability.cache_manager import hash_audio
+        
+        audio_bytes = os.urandom(2 * 1024 * 1024 + 5)
+        
+        class ReadOnlyStream:
+            def __init__(self, data):
+                self._buf = io.BytesIO(data)
+            
+            def read(self, size=-1):
+                return self._buf.read(size)
+        
+        assert hash_audio(ReadOnlyStream(audio_bytes)) == hash_audio(audio_bytes)
+    
+    @pytest.mark.unit
+    def test_hash_audio_is_blake2b_128(self):
+        """Fingerprints must not depend on optional packages installed per worker"""
+        import hashlib
+        from scalability.cache_manager import hash_audio
+        
+        assert hash_audio(b"abc") == hashlib.blake2b(b"abc", digest_size=16).hexdigest()
+
+
+class TestRedisPool:
+    """Tests for shared Redis connection pools"""
+    
+    @pytest.mark.unit
+    def test_same_settings_share_pool(self):
+        """Clients with the same settings should reuse one pool"""
+        from scalability.redis_pool import get_client
+        
+        a = get_client(decode_responses=True)
+        b = get_client(decode_responses=True)
+        
+        assert a.connection_pool is b.connection_pool
+    
+    @pytest.mark.unit
+    def test_decode_modes_use_separate_pools(self):
+        """str and bytes clients can't share connections"""
+        from scalability.redis_pool import get_pool
+        
+        assert get_pool(decode_responses=True) is not get_pool(decode_responses=False)
+    
+    @pytest.mark.unit
+    def test_pools_bounded_with_keepalive(self):
+        """Sync and async pools should cap connections and enable keepalive"""
+        from scalability.redis_pool import get_pool, get_async_pool, REDIS_POOL_SIZE
+        
+        for pool in (get_pool(), get_async_pool()):
+            assert pool.max_connections == REDIS_POOL_SIZE
+            assert pool.connection_kwargs["socket_keepalive"] is True
+
+
+class TestAutoPipeline:
+    """Tests for coalescing same-tick commands into one pipeline"""
+    
+    @pytest.mark.unit
+    async def test_same_tick_commands_share_one_pipeline(self):
+        """Concurrent commands should be sent in a single pipeline"""
+        import asyncio
+        from unittest.mock import AsyncMock
+        from scalability.redis_pool import AutoPipeline
+        
+        client = MagicMock()
+        pipe = client.pipeline.return_value
+        pipe.execute = AsyncMock(return_value=[True, 1, "1"])
+        auto = AutoPipeline(client)
+        
+        results = await asyncio.gather(
+            auto.set("k", 0, ex=60, nx=True),
+            auto.incr("k"),
+            auto.get("k")
+        )
+        
+        assert results == [True, 1, "1"]
+        client.pipeline.assert_called_once_with(transaction=False)
+        assert [c.args[0] for c in pipe.execute_command.call_args_list] == ["SET", "INCRBY", "GET"]
+    
+    @pytest.mark.unit
+    async def test_error_reaches_only_failing_command(self):
+        """A per-command error should not fail the rest of the batch"""
+        import asyncio
+        from unittest.mock import AsyncMock
+        from redis.exceptions import ResponseError
+        from scalability.redis_pool import AutoPipeline
+        
+        client = MagicMock()
+        client.pipeline.return_value.execute = AsyncMock(return_value=[ResponseError("WRONGTYPE"), 2])
+        auto = AutoPipeline(client)
+        
+        results = await asyncio.gather(auto.incr("a"), auto.incr("b"), return_exceptions=True)
+        
+        assert isinstance(results[0], ResponseError)
+        assert results[1] == 2
+    
+    @pytest.mark.unit
+    async def test_connection_error_fails_whole_batch(self):
+        """If the pipeline can't be sent every waiter should see the error"""
+        import asyncio
+        from unittest.mock import AsyncMock
+        from scalability.redis_pool import AutoPipeline
+        
+        client = MagicMock()
+        client.pipeline.return_value.execute = AsyncMock(side_effect=ConnectionError("down"))
+        auto = AutoPipeline(client)
+        
+        results = await asyncio.gather(auto.get("a"), auto.get("b"), return_exceptions=True)
+        
+        assert all(isinstance(r, ConnectionError) for r in results)
+    
+    @pytest.mark.unit
+    async def test_pending_flush_is_referenced(self):
+        """In-flight flush tasks should be held until they finish"""
+        import asyncio
+        from unittest.mock import AsyncMock
+        from scalability.redis_pool import AutoPipeline
+        
+        release = asyncio.Event()
+        
+        async def execute(raise_on_error=False):
+            await release.wait()
+            return ["v"]
+        
+        client = MagicMock()
+        client.pipeline.return_value.execute = AsyncMock(side_effect=execute)
+        auto = AutoPipeline(client)
+        
+        pending = asyncio.ensure_future(auto.get("a"))
+        await asyncio.sleep(0.01)
+        assert len(auto._flush_tasks) == 1
+        
+        release.set()
+        assert await pending == "v"
+        await asyncio.sleep(0)
+        assert not auto._flush_tasks
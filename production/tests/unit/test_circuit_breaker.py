@@ -9,10 +9,6 @@ These tests verify circuit breaker state transitions and error handling.
 
 import pytest
 import time
-import sys
-import os
-
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from reliability.circuit_breaker import (
     CircuitBreaker,
@@ -22,20 +18,36 @@ from reliability.circuit_breaker import (
 )
 
 
+@pytest.fixture
+def cb(request):
+    """Fresh breaker named after the test (threshold 3, or indirect param)"""
+    return CircuitBreaker(
+        name=f"cb_{request.node.name}",
+        failure_threshold=getattr(request, "param", 3)
+    )
+
+
+@pytest.fixture
+def clean_registry():
+    """Global registry, emptied for the test and restored afterwards"""
+    saved = dict(registry.breakers)
+    registry.breakers.clear()
+    yield registry
+    registry.breakers.clear()
+    registry.breakers.update(saved)
+
+
 class TestCircuitBreakerStates:
     """Test circuit breaker state transitions"""
     
     @pytest.mark.unit
-    def test_initial_state_is_closed(self):
+    def test_initial_state_is_closed(self, cb):
         """Circuit breaker should start in CLOSED state"""
-        cb = CircuitBreaker(name="test_initial", failure_threshold=3)
         assert cb.state == CircuitState.CLOSED
     
     @pytest.mark.unit
-    def test_stays_closed_under_threshold(self):
+    def test_stays_closed_under_threshold(self, cb):
         """Circuit should stay closed if failures < threshold"""
-        cb = CircuitBreaker(name="test_under", failure_threshold=3)
-        
         # Simulate failures via internal method
         cb._on_failure()
         assert cb.state == CircuitState.CLOSED
@@ -44,10 +56,8 @@ class TestCircuitBreakerStates:
         assert cb.state == CircuitState.CLOSED
     
     @pytest.mark.unit
-    def test_opens_at_threshold(self):
+    def test_opens_at_threshold(self, cb):
         """Circuit should open when failures reach threshold"""
-        cb = CircuitBreaker(name="test_threshold", failure_threshold=3)
-        
         cb._on_failure()
         cb._on_failure()
         cb._on_failure()
@@ -55,9 +65,9 @@ class TestCircuitBreakerStates:
         assert cb.state == CircuitState.OPEN
     
     @pytest.mark.unit
-    def test_open_circuit_raises_error(self):
+    @pytest.mark.parametrize("cb", [1], indirect=True)
+    def test_open_circuit_raises_error(self, cb):
         """Open circuit should raise CircuitBreakerError"""
-        cb = CircuitBreaker(name="test_raises", failure_threshold=1)
         cb._on_failure()  # Opens circuit
         
         with pytest.raises(CircuitBreakerError):
@@ -65,9 +75,9 @@ class TestCircuitBreakerStates:
                 pass  # Should not reach here
     
     @pytest.mark.unit
-    def test_reset_closes_circuit(self):
+    @pytest.mark.parametrize("cb", [1], indirect=True)
+    def test_reset_closes_circuit(self, cb):
         """Reset should close an open circuit"""
-        cb = CircuitBreaker(name="test_reset", failure_threshold=1)
         cb._on_failure()
         assert cb.state == CircuitState.OPEN
         
@@ -76,10 +86,9 @@ class TestCircuitBreakerStates:
         assert cb.failure_count == 0
     
     @pytest.mark.unit
-    def test_success_reduces_failure_count(self):
+    @pytest.mark.parametrize("cb", [5], indirect=True)
+    def test_success_reduces_failure_count(self, cb):
         """Successful call should reduce failure count"""
-        cb = CircuitBreaker(name="test_success", failure_threshold=5)
-        
         cb._on_failure()
         cb._on_failure()
         assert cb.failure_count == 2
@@ -92,10 +101,8 @@ class TestCircuitBreakerContextManager:
     """Test circuit breaker as context manager"""
     
     @pytest.mark.unit
-    def test_successful_execution(self):
+    def test_successful_execution(self, cb):
         """Successful execution should work normally"""
-        cb = CircuitBreaker(name="test_ctx_success", failure_threshold=3)
-        
         with cb:
             result = 1 + 1
         
@@ -103,10 +110,33 @@ class TestCircuitBreakerContextManager:
         assert cb.state == CircuitState.CLOSED
     
     @pytest.mark.unit
-    def test_exception_records_failure(self):
-        """Exception inside context should record failure"""
-        cb = CircuitBreaker(name="test_ctx_fail", failure_threshold=3)
+    def test_success_after_failures_decays_count(self, cb):
+        """Successful block should still reduce an outstanding failure count"""
+        cb._on_failure()
+        cb._on_failure()
+        
+        with cb:
+            pass
         
+        assert cb.failure_count == 1
+        assert cb.get_stats()["total_successes"] == 1
+    
+    @pytest.mark.unit
+    @pytest.mark.parametrize("cb", [1], indirect=True)
+    def test_half_open_success_closes(self, cb):
+        """Successful block in HALF_OPEN should close the circuit"""
+        cb.recovery_timeout = 0
+        cb._on_failure()
+        
+        with cb:
+            assert cb.state == CircuitState.HALF_OPEN
+        
+        assert cb.state == CircuitState.CLOSED
+        assert cb.failure_count == 0
+    
+    @pytest.mark.unit
+    def test_exception_records_failure(self, cb):
+        """Exception inside context should record failure"""
         with pytest.raises(ValueError):
             with cb:
                 raise ValueError("Test error")
@@ -133,23 +163,22 @@ class TestCircuitBreakerRegistry:
     """Test circuit breaker registry"""
     
     @pytest.mark.unit
-    def test_registry_stores_breakers(self):
+    def test_registry_stores_breakers(self, cb, clean_registry):
         """Registry should store circuit breakers by name"""
-        cb = CircuitBreaker(name="test_registry_store_v2", failure_threshold=3)
-        registry.register(cb)
+        clean_registry.register(cb)
         
-        retrieved = registry.get("test_registry_store_v2")
+        retrieved = clean_registry.get(cb.name)
         assert retrieved is cb
     
     @pytest.mark.unit
-    def test_registry_get_all_stats(self):
+    def test_registry_get_all_stats(self, clean_registry):
         """Registry should return stats for all breakers"""
         cb1 = CircuitBreaker(name="test_stats_1_v2", failure_threshold=3)
         cb2 = CircuitBreaker(name="test_stats_2_v2", failure_threshold=3)
-        registry.register(cb1)
-        registry.register(cb2)
+        clean_registry.register(cb1)
+        clean_registry.register(cb2)
         
-        stats = registry.get_all_stats()
+        stats = clean_registry.get_all_stats()
         
         assert isinstance(stats, list)
         # Check that our breakers are in there
@@ -158,12 +187,12 @@ class TestCircuitBreakerRegistry:
         assert "test_stats_2_v2" in names
     
     @pytest.mark.unit
-    def test_registry_reset_all(self):
+    def test_registry_reset_all(self, clean_registry):
         """Registry reset_all should reset all breakers"""
         cb1 = CircuitBreaker(name="test_reset_all_1_v2", failure_threshold=1)
         cb2 = CircuitBreaker(name="test_reset_all_2_v2", failure_threshold=1)
-        registry.register(cb1)
-        registry.register(cb2)
+        clean_registry.register(cb1)
+        clean_registry.register(cb2)
         
         cb1._on_failure()
         cb2._on_failure()
@@ -171,7 +200,7 @@ class TestCircuitBreakerRegistry:
         assert cb1.state == CircuitState.OPEN
         assert cb2.state == CircuitState.OPEN
         
-        registry.reset_all()
+        clean_registry.reset_all()
         
         assert cb1.state == CircuitState.CLOSED
         assert cb2.state == CircuitState.CLOSED
@@ -181,10 +210,8 @@ class TestCircuitBreakerStats:
     """Test circuit breaker statistics"""
     
     @pytest.mark.unit
-    def test_get_stats_structure(self):
+    def test_get_stats_structure(self, cb):
         """Stats should have correct structure"""
-        cb = CircuitBreaker(name="test_stats_struct_v2", failure_threshold=3)
-        
         stats = cb.get_stats()
         
         assert "state" in stats
@@ -194,10 +221,8 @@ class TestCircuitBreakerStats:
         assert "name" in stats
     
     @pytest.mark.unit
-    def test_stats_track_calls(self):
+    def test_stats_track_calls(self, cb):
         """Stats should track total calls"""
-        cb = CircuitBreaker(name="test_stats_calls", failure_threshold=5)
-        
         # Execute successfully
         with cb:
             pass
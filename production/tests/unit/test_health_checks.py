@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Unit Tests: Health Checks
+=========================
+
+Tests for reliability/health_checks.py
+These tests verify individual checks and the aggregate health monitor.
+"""
+
+import pytest
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from reliability.health_checks import (
+    DependencyHealthCheck,
+    HealthCheck,
+    HealthMonitor,
+    HealthStatus,
+    ModelHealthCheck,
+)
+
+
+class StaticCheck(HealthCheck):
+    """Check that always reports a fixed status"""
+
+    def __init__(self, name, status):
+        super().__init__(name)
+        self.status = status
+
+    def check(self):
+        return {
+            'name': self.name,
+            'status': self.status.value,
+            'details': {},
+            'timestamp': '2025-01-01T00:00:00'
+        }
+
+
+class ThreadRecordingCheck(StaticCheck):
+    """Check that records which thread ran it"""
+
+    def check(self):
+        self.thread_id = threading.get_ident()
+        return super().check()
+
+
+class SlowCheck(StaticCheck):
+    """Expensive check that takes a while to report"""
+
+    cost = 10
+
+    def check(self):
+        time.sleep(0.5)
+        return super().check()
+
+
+class FailingCheck(HealthCheck):
+    """Check that raises instead of returning a result"""
+
+    def check(self):
+        raise RuntimeError("boom")
+
+
+class TestDependencyHealthCheck:
+    """Test Redis dependency check"""
+
+    @pytest.mark.unit
+    def test_healthy_when_ping_succeeds(self):
+        """Successful ping should report healthy"""
+        redis_client = MagicMock()
+        redis_client.ping.return_value = True
+
+        result = DependencyHealthCheck(redis_client).check()
+
+        assert result['status'] == HealthStatus.HEALTHY.value
+        assert result['details']['redis']['connected'] is True
+
+    @pytest.mark.unit
+    def test_unhealthy_when_ping_raises(self):
+        """Ping error should report unhealthy"""
+        redis_client = MagicMock()
+        redis_client.ping.side_effect = ConnectionError("refused")
+
+        result = DependencyHealthCheck(redis_client).check()
+
+        assert result['status'] == HealthStatus.UNHEALTHY.value
+        assert 'refused' in result['details']['redis']['error']
+
+    @pytest.mark.unit
+    def test_hung_ping_times_out(self):
+        """A hung ping should be cut off at timeout_seconds"""
+        redis_client = MagicMock()
+        redis_client.ping.side_effect = lambda: time.sleep(1.0)
+
+        check = DependencyHealthCheck(redis_client, timeout_seconds=0.05)
+        start = time.time()
+        result = check.check()
+
+        assert time.time() - start < 0.5
+        assert result['status'] == HealthStatus.UNHEALTHY.value
+        assert result['details']['redis']['connected'] is False
+
+    @pytest.mark.unit
+    def test_hung_ping_is_not_queued_behind(self):
+        """Checks during a hung ping should wait on it, not submit another"""
+        redis_client = MagicMock()
+        redis_client.ping.side_effect = lambda: time.sleep(0.3)
+
+        check = DependencyHealthCheck(redis_client, timeout_seconds=0.05)
+        check.check()
+        result = check.check()
+
+        assert redis_client.ping.call_count == 1
+        assert result['status'] == HealthStatus.UNHEALTHY.value
+
+
+class TestModelHealthCheck:
+    """Test the model inference probe"""
+
+    @pytest.mark.unit
+    def test_probe_runs_on_inference_executor(self):
+        """Probe should go through the translator's single inference thread"""
+        translator = MagicMock()
+        translator.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        probe_threads = []
+        translator._transcribe_sync.side_effect = (
+            lambda audio: probe_threads.append(threading.current_thread().name) or ""
+        )
+
+        try:
+            result = ModelHealthCheck(translator).check()
+        finally:
+            translator.executor.shutdown(wait=True)
+
+        assert result['status'] == HealthStatus.HEALTHY.value
+        assert probe_threads and probe_threads[0].startswith("inference")
+        translator.whisper_model.transcribe.assert_not_called()
+
+
+class TestHealthMonitor:
+    """Test aggregate status computation"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("statuses,expected", [
+        ([HealthStatus.HEALTHY, HealthStatus.HEALTHY], HealthStatus.HEALTHY),
+        ([HealthStatus.HEALTHY, HealthStatus.DEGRADED], HealthStatus.DEGRADED),
+        ([HealthStatus.DEGRADED, HealthStatus.UNHEALTHY], HealthStatus.UNHEALTHY),
+    ])
+    def test_overall_status_is_worst(self, statuses, expected):
+        """Overall status should be the most severe check status"""
+        monitor = HealthMonitor()
+        for i, status in enumerate(statuses):
+            monitor.add_check(StaticCheck(f"check_{i}", status))
+
+        assert monitor.run_all_checks()['overall_status'] == expected.value
+
+    @pytest.mark.unit
+    def test_failing_check_shares_aggregate_timestamp(self):
+        """Synthesized error results reuse the aggregate timestamp"""
+        monitor = HealthMonitor()
+        monitor.add_check(FailingCheck("broken"))
+
+        report = monitor.run_all_checks()
+
+        assert report['overall_status'] == HealthStatus.UNHEALTHY.value
+        assert report['checks'][0]['timestamp'] == report['timestamp']
+
+    @pytest.mark.unit
+    async def test_async_matches_sync(self):
+        """Async aggregate should agree with the sync one"""
+        monitor = HealthMonitor()
+        monitor.add_check(StaticCheck("ok", HealthStatus.HEALTHY))
+        monitor.add_check(FailingCheck("broken"))
+
+        report = await monitor.run_all_checks_async()
+
+        assert report['overall_status'] == HealthStatus.UNHEALTHY.value
+        assert report['checks'][1]['timestamp'] == report['timestamp']
+
+    @pytest.mark.unit
+    async def test_non_blocking_checks_run_inline(self):
+        """Only blocking checks should be offloaded to a worker thread"""
+        inline = ThreadRecordingCheck("inline", HealthStatus.HEALTHY)
+        inline.is_blocking = False
+        offloaded = ThreadRecordingCheck("offloaded", HealthStatus.HEALTHY)
+
+        monitor = HealthMonitor()
+        monitor.add_check(inline)
+        monitor.add_check(offloaded)
+        await monitor.run_all_checks_async()
+
+        assert inline.thread_id == threading.get_ident()
+        assert offloaded.thread_id != threading.get_ident()
+
+
+class TestLiveness:
+    """Test fast liveness aggregate"""
+
+    @pytest.mark.unit
+    def test_checks_ordered_by_cost(self):
+        """Cheap checks should be ordered ahead of expensive ones"""
+        monitor = HealthMonitor()
+        monitor.add_check(SlowCheck("slow", HealthStatus.HEALTHY))
+        monitor.add_check(StaticCheck("fast", HealthStatus.HEALTHY))
+
+        assert [c.name for c in monitor.checks] == ["fast", "slow"]
+
+    @pytest.mark.unit
+    async def test_skips_expensive_checks(self):
+        """Liveness should not wait on checks above max_cost"""
+        monitor = HealthMonitor()
+        monitor.add_check(StaticCheck("fast", HealthStatus.HEALTHY))
+        monitor.add_check(SlowCheck("slow", HealthStatus.HEALTHY))
+
+        start = time.time()
+        report = await monitor.run_liveness()
+
+        assert time.time() - start < 0.4
+        assert report['overall_status'] == HealthStatus.HEALTHY.value
+        assert [r['name'] for r in report['checks']] == ["fast"]
+        assert report['complete'] is True
+
+    @pytest.mark.unit
+    async def test_fail_fast_on_unhealthy(self):
+        """Liveness should return on the first unhealthy result"""
+        monitor = HealthMonitor()
+        monitor.add_check(FailingCheck("broken"))
+        monitor.add_check(SlowCheck("slow", HealthStatus.HEALTHY))
+
+        start = time.time()
+        report = await monitor.run_liveness(max_cost=10)
+
+        assert time.time() - start < 0.4
+        assert report['overall_status'] == HealthStatus.UNHEALTHY.value
+        assert report['complete'] is False
@@ -8,11 +8,30 @@ These tests verify rate limiting logic.
 """
 
 import pytest
-import sys
-import os
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import HTTPException
+from redis.exceptions import NoScriptError
+from starlette.datastructures import State
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from security import rate_limiter
+from security.auth import get_rate_limit
+from security.rate_limiter import (
+    DENY_CACHE_SECONDS,
+    SYSTEM_LOAD_TTL,
+    AdaptiveRateLimiter,
+    RateLimiter,
+    _COUNTER_SCRIPT,
+    _deny_until,
+    _remember_denial,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_deny_cache():
+    """Rejections are cached per process; don't leak them between tests"""
+    _deny_until.clear()
+    yield
+    _deny_until.clear()
 
 
 class TestRateLimiterBasics:
@@ -21,27 +40,22 @@ class TestRateLimiterBasics:
     @pytest.mark.unit
     def test_rate_limiter_import(self):
         """RateLimiter should be importable"""
-        from security.rate_limiter import RateLimiter
         limiter = RateLimiter()
         assert limiter is not None
     
     @pytest.mark.unit
     def test_rate_limiter_disabled_without_redis(self):
         """Rate limiter should be disabled when Redis unavailable"""
-        from security.rate_limiter import RateLimiter
-        
         limiter = RateLimiter()
         # Without Redis, enabled should be False
         # (depends on environment - may be True if Redis is running)
         assert hasattr(limiter, 'enabled')
     
     @pytest.mark.unit
-    def test_check_rate_limit_returns_tuple(self, mock_redis):
+    async def test_check_rate_limit_returns_tuple(self, mock_async_redis):
         """check_rate_limit should return (allowed, info) tuple"""
-        from security.rate_limiter import RateLimiter
-        
         limiter = RateLimiter()
-        limiter.redis = mock_redis
+        limiter.redis = mock_async_redis
         limiter.enabled = True
         
         # Create mock request
@@ -49,7 +63,7 @@ class TestRateLimiterBasics:
         mock_request.headers.get.return_value = None
         mock_request.client.host = "127.0.0.1"
         
-        allowed, info = limiter.check_rate_limit(
+        allowed, info = await limiter.check_rate_limit(
             mock_request,
             user_data=None,
             max_requests=60,
@@ -62,16 +76,14 @@ class TestRateLimiterBasics:
         assert "remaining" in info
     
     @pytest.mark.unit
-    def test_rate_limit_allows_when_disabled(self):
+    async def test_rate_limit_allows_when_disabled(self):
         """When disabled, all requests should be allowed"""
-        from security.rate_limiter import RateLimiter
-        
         limiter = RateLimiter()
         limiter.enabled = False
         
         mock_request = MagicMock()
         
-        allowed, info = limiter.check_rate_limit(
+        allowed, info = await limiter.check_rate_limit(
             mock_request,
             user_data=None,
             max_requests=1,  # Very low limit
@@ -81,17 +93,350 @@ class TestRateLimiterBasics:
         assert allowed is True
 
 
+class TestSlidingWindow:
+    """Tests for the server-side sliding window script"""
+    
+    @pytest.mark.unit
+    async def test_single_script_call_per_check(self, mock_async_redis):
+        """A check should be one EVALSHA"""
+        limiter = RateLimiter()
+        limiter.redis = mock_async_redis
+        limiter.enabled = True
+        
+        mock_request = MagicMock()
+        mock_request.headers.get.return_value = None
+        mock_request.client.host = "127.0.0.1"
+        
+        allowed, info = await limiter.check_rate_limit(mock_request, None, 60, 60)
+        
+        assert allowed is True
+        assert info["current"] == 5
+        assert info["remaining"] == 54
+        mock_async_redis.evalsha.assert_awaited_once()
+    
+    @pytest.mark.unit
+    async def test_denied_when_script_rejects(self, mock_async_redis):
+        """Script verdict should be returned as-is"""
+        limiter = RateLimiter()
+        limiter.redis = mock_async_redis
+        limiter.enabled = True
+        mock_async_redis.evalsha.return_value = [10, 0]
+        
+        mock_request = MagicMock()
+        mock_request.headers.get.return_value = None
+        mock_request.client.host = "127.0.0.1"
+        
+        allowed, info = await limiter.check_rate_limit(mock_request, None, 10, 60)
+        
+        assert allowed is False
+        assert info["remaining"] == 0
+    
+    @pytest.mark.unit
+    async def test_script_reloaded_after_noscript(self, mock_async_redis):
+        """A flushed script cache should trigger SCRIPT LOAD and one retry"""
+        limiter = RateLimiter()
+        limiter.redis = mock_async_redis
+        mock_async_redis.evalsha.side_effect = [NoScriptError("NOSCRIPT"), [1, 1]]
+        
+        result = await limiter._sliding_window("k", 1000.0, 10, 60)
+        
+        assert result == (1, True)
+        mock_async_redis.script_load.assert_awaited_once()
+    
+    @pytest.mark.unit
+    async def test_members_unique_within_timestamp(self, mock_async_redis):
+        """Requests at the same instant should log distinct members"""
+        limiter = RateLimiter()
+        limiter.redis = mock_async_redis
+        
+        await limiter._sliding_window("k", 1000.0, 10, 60)
+        await limiter._sliding_window("k", 1000.0, 10, 60)
+        
+        calls = [c.args for c in mock_async_redis.evalsha.call_args_list]
+        members = [args[-1] for args in calls]
+        assert members[0] != members[1]
+        # Integer microsecond score, member = score in the high bits
+        assert calls[0][4] == 1_000_000_000
+        assert calls[0][3] == 940_000_000
+        assert all(m >> 10 == 1_000_000_000 for m in members)
+
+
+class TestFixedWindow:
+    """Tests for bucketed counter windows"""
+    
+    @pytest.mark.unit
+    def test_unknown_strategy_rejected(self):
+        """Only known strategies should be accepted"""
+        with pytest.raises(ValueError):
+            RateLimiter(strategy="leaky")
+    
+    @pytest.mark.unit
+    async def test_endpoint_limit_uses_bucket_counter(self, mock_async_redis):
+        """Endpoint limits should count in a per-bucket key, not the sliding window"""
+        limiter = RateLimiter()
+        limiter.redis = mock_async_redis
+        limiter.enabled = True
+        mock_async_redis.evalsha.return_value = 11
+        
+        mock_request = MagicMock()
+        mock_request.state = State()
+        mock_request.headers.get.return_value = None
+        mock_request.client.host = "127.0.0.1"
+        
+        with patch("security.rate_limiter.time.time", return_value=125.0):
+            allowed, info = await limiter.check_endpoint_limit(mock_request, "/translate", None, 10, 60)
+        
+        assert allowed is False
+        assert info["remaining"] == 0
+        assert info["reset"] == 180
+        mock_async_redis.evalsha.assert_awaited_once_with(
+            _COUNTER_SCRIPT.sha, 1, "endpoint_limit:ip:127.0.0.1:/translate:60:2", 120
+        )
+    
+    @pytest.mark.unit
+    async def test_fixed_strategy_for_rate_limit(self, mock_async_redis):
+        """strategy='fixed' should switch check_rate_limit to counters"""
+        limiter = RateLimiter(strategy="fixed")
+        limiter.redis = mock_async_redis
+        limiter.enabled = True
+        mock_async_redis.evalsha.return_value = 3
+        
+        mock_request = MagicMock()
+        mock_request.headers.get.return_value = None
+        mock_request.client.host = "127.0.0.1"
+        
+        allowed, info = await limiter.check_rate_limit(mock_request, None, 60, 60)
+        
+        assert allowed is True
+        assert info["current"] == 2
+        assert info["remaining"] == 57
+        assert mock_async_redis.evalsha.call_args.args[0] == _COUNTER_SCRIPT.sha
+
+
+class TestDenyCache:
+    """Tests for the in-process short-circuit after a rejection"""
+    
+    @pytest.mark.unit
+    async def test_repeat_rejection_skips_redis(self, mock_async_redis):
+        """A client already over its limit should be rejected without Redis"""
+        limiter = RateLimiter()
+        limiter.redis = mock_async_redis
+        limiter.enabled = True
+        mock_async_redis.evalsha.return_value = [10, 0]
+        
+        mock_request = MagicMock()
+        mock_request.state = State()
+        mock_request.headers.get.return_value = None
+        mock_request.client.host = "127.0.0.1"
+        
+        first = await limiter.check_rate_limit(mock_request, None, 10, 60)
+        second = await limiter.check_rate_limit(mock_request, None, 10, 60)
+        
+        assert first[0] is False and second[0] is False
+        assert second[1] == first[1]
+        mock_async_redis.evalsha.assert_awaited_once()
+    
+    @pytest.mark.unit
+    async def test_rejection_is_per_limit(self, mock_async_redis):
+        """A rejection under a low limit should not short-circuit a higher one"""
+        limiter = RateLimiter()
+        limiter.redis = mock_async_redis
+        limiter.enabled = True
+        mock_async_redis.evalsha.return_value = [10, 0]
+        
+        mock_request = MagicMock()
+        mock_request.state = State()
+        mock_request.headers.get.return_value = None
+        mock_request.client.host = "127.0.0.1"
+        
+        await limiter.check_rate_limit(mock_request, None, 10, 60)
+        mock_async_redis.evalsha.return_value = [10, 1]
+        allowed, info = await limiter.check_rate_limit(mock_request, None, 100, 60)
+        
+        assert allowed is True
+        assert info["limit"] == 100
+        assert mock_async_redis.evalsha.await_count == 2
+    
+    @pytest.mark.unit
+    async def test_rejection_expires(self, mock_async_redis):
+        """After the deny window Redis should be consulted again"""
+        limiter = RateLimiter()
+        limiter.redis = mock_async_redis
+        limiter.enabled = True
+        mock_async_redis.evalsha.return_value = [10, 0]
+        
+        mock_request = MagicMock()
+        mock_request.state = State()
+        mock_request.headers.get.return_value = None
+        mock_request.client.host = "127.0.0.1"
+        
+        with patch("security.rate_limiter.time.time", return_value=1000.0):
+            await limiter.check_rate_limit(mock_request, None, 10, 60)
+        with patch("security.rate_limiter.time.time", return_value=1000.0 + DENY_CACHE_SECONDS):
+            await limiter.check_rate_limit(mock_request, None, 10, 60)
+        
+        assert mock_async_redis.evalsha.await_count == 2
+    
+    @pytest.mark.unit
+    def test_cache_size_bounded(self):
+        """Oldest entries should be evicted at the size cap"""
+        with patch("security.rate_limiter._DENY_CACHE_MAX_ENTRIES", 2):
+            for key in ("a", "b", "c"):
+                _remember_denial(key, 0.0, 60, {})
+        
+        assert list(_deny_until) == ["b", "c"]
+
+
+class TestDailyLimit:
+    """Tests for the per-day counter"""
+    
+    @pytest.mark.unit
+    async def test_counter_created_with_ttl(self, mock_async_redis):
+        """Counting and the TTL should go out as one counter script call"""
+        limiter = RateLimiter()
+        limiter.redis = mock_async_redis
+        limiter.enabled = True
+        mock_async_redis.evalsha.return_value = 1
+        
+        mock_request = MagicMock()
+        mock_request.state = State()
+        mock_request.headers.get.return_value = None
+        mock_request.client.host = "127.0.0.1"
+        
+        allowed, info = await limiter.check_daily_limit(mock_request, None, max_requests=100)
+        
+        assert allowed is True
+        assert info["current"] == 1
+        assert info["remaining"] == 99
+        sha, numkeys, key, ttl = mock_async_redis.evalsha.call_args.args
+        assert sha == _COUNTER_SCRIPT.sha
+        assert key.startswith("daily_limit:ip:127.0.0.1:")
+        assert 0 < ttl <= 86400
+        mock_async_redis.incr.assert_not_called()
+
+
+class TestAllLimits:
+    """Tests for combined window + daily checks"""
+    
+    @pytest.mark.unit
+    async def test_one_script_call_for_both_limits(self, mock_async_redis):
+        """Window and daily limits should be decided by a single EVALSHA"""
+        limiter = RateLimiter()
+        limiter.redis = mock_async_redis
+        limiter.enabled = True
+        mock_async_redis.evalsha.return_value = [5, 1, 42, 1]
+        
+        mock_request = MagicMock()
+        mock_request.state = State()
+        mock_request.headers.get.return_value = None
+        mock_request.client.host = "127.0.0.1"
+        
+        (allowed, info), (daily_allowed, daily_info) = await limiter.check_all_limits(
+            mock_request, None, max_requests=60, window_seconds=60, max_daily=100
+        )
+        
+        assert allowed is True and daily_allowed is True
+        assert info["current"] == 5
+        assert daily_info["current"] == 42
+        assert daily_info["remaining"] == 58
+        mock_async_redis.evalsha.assert_awaited_once()
+        args = mock_async_redis.evalsha.call_args.args
+        assert args[1] == 2
+        assert args[2] == "rate_limit:ip:127.0.0.1:60"
+        assert args[3].startswith("daily_limit:ip:127.0.0.1:")
+    
+    @pytest.mark.unit
+    async def test_allows_both_when_disabled(self):
+        """Without Redis both limits should pass"""
+        limiter = RateLimiter()
+        limiter.enabled = False
+        
+        (allowed, _), (daily_allowed, _) = await limiter.check_all_limits(MagicMock(), None, 1, 60, 1)
+        
+        assert allowed is True and daily_allowed is True
+    
+    @pytest.mark.unit
+    async def test_middleware_rejects_on_daily_limit(self, mock_async_redis):
+        """daily_max should make the decorator enforce the daily limit"""
+        limiter = rate_limiter.RateLimiter()
+        limiter.redis = mock_async_redis
+        limiter.enabled = True
+        mock_async_redis.evalsha.return_value = [5, 1, 100, 0]
+        
+        @rate_limiter.rate_limit_middleware(max_requests=60, daily_max=100)
+        async def endpoint(request):
+            return MagicMock(headers={})
+        
+        mock_request = MagicMock()
+        mock_request.state = State()
+        mock_request.headers.get.return_value = None
+        mock_request.client.host = "127.0.0.1"
+        
+        with patch.object(rate_limiter, "_DEFAULT_LIMITER", limiter):
+            with pytest.raises(HTTPException) as exc_info:
+                await endpoint(mock_request)
+        
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.detail["error"] == "Daily limit exceeded"
+        assert int(exc_info.value.headers["Retry-After"]) > 0
+
+
+class TestAdaptiveRateLimiter:
+    """Tests for load-adjusted limits"""
+    
+    @pytest.mark.unit
+    async def test_load_reading_reused_briefly(self, mock_async_redis):
+        """System load should be read from Redis at most once per TTL"""
+        limiter = AdaptiveRateLimiter()
+        limiter.redis = mock_async_redis
+        limiter.enabled = True
+        mock_async_redis.get.return_value = b"80"
+        
+        with patch("security.rate_limiter.time.monotonic", return_value=100.0):
+            assert await limiter.get_adaptive_limit("pro") == 100
+            assert await limiter.get_adaptive_limit("pro") == 100
+        mock_async_redis.get.return_value = b"10"
+        with patch("security.rate_limiter.time.monotonic", return_value=100.0 + SYSTEM_LOAD_TTL + 0.01):
+            assert await limiter.get_adaptive_limit("pro") == 200
+        
+        assert mock_async_redis.get.await_count == 2
+
+
+class TestRateLimitMiddleware:
+    """Tests for the endpoint decorator"""
+    
+    @pytest.mark.unit
+    async def test_reuses_shared_limiter(self):
+        """The decorator should not build a limiter per request"""
+        shared = MagicMock()
+        shared.check_rate_limit = AsyncMock(
+            return_value=(True, {"limit": 5, "remaining": 4, "reset": 0, "current": 0})
+        )
+        
+        @rate_limiter.rate_limit_middleware(max_requests=5)
+        async def endpoint(request):
+            return MagicMock(headers={})
+        
+        with patch.object(rate_limiter, "_DEFAULT_LIMITER", shared), \
+             patch.object(rate_limiter, "RateLimiter") as constructor:
+            await endpoint(MagicMock())
+            response = await endpoint(MagicMock())
+        
+        constructor.assert_not_called()
+        assert shared.check_rate_limit.await_count == 2
+        assert response.headers["X-RateLimit-Remaining"] == "4"
+
+
 class TestRateLimiterIdentifier:
     """Tests for request identifier extraction"""
     
     @pytest.mark.unit
     def test_identifier_uses_api_key_when_present(self):
         """Should use user_id from user_data when available"""
-        from security.rate_limiter import RateLimiter
-        
         limiter = RateLimiter()
         
         mock_request = MagicMock()
+        mock_request.state = State()
         user_data = {"user_id": "test_user_123", "tier": "pro"}
         
         identifier = limiter._get_identifier(mock_request, user_data)
@@ -101,11 +446,10 @@ class TestRateLimiterIdentifier:
     @pytest.mark.unit
     def test_identifier_uses_ip_as_fallback(self):
         """Should use IP address when no user_data"""
-        from security.rate_limiter import RateLimiter
-        
         limiter = RateLimiter()
         
         mock_request = MagicMock()
+        mock_request.state = State()
         mock_request.headers.get.return_value = None
         mock_request.client.host = "192.168.1.100"
         
@@ -116,11 +460,10 @@ class TestRateLimiterIdentifier:
     @pytest.mark.unit
     def test_identifier_uses_forwarded_for_header(self):
         """Should use X-Forwarded-For header for proxied requests"""
-        from security.rate_limiter import RateLimiter
-        
         limiter = RateLimiter()
         
         mock_request = MagicMock()
+        mock_request.state = State()
         mock_request.headers.get.return_value = "10.0.0.1, 10.0.0.2"
         mock_request.client.host = "127.0.0.1"
         
@@ -128,6 +471,21 @@ class TestRateLimiterIdentifier:
         
         # Should use first IP from X-Forwarded-For
         assert "10.0.0.1" in identifier
+    
+    @pytest.mark.unit
+    def test_identifier_computed_once_per_request(self):
+        """Later limiters on the same request should reuse the identifier"""
+        limiter = RateLimiter()
+        
+        mock_request = MagicMock()
+        mock_request.state = State()
+        mock_request.headers.get.return_value = "10.0.0.1"
+        
+        first = limiter._get_identifier(mock_request, None)
+        second = limiter._get_identifier(mock_request, None)
+        
+        assert first == second == "ip:10.0.0.1"
+        mock_request.headers.get.assert_called_once()
 
 
 class TestRateLimits:
@@ -136,8 +494,6 @@ class TestRateLimits:
     @pytest.mark.unit
     def test_get_rate_limit_free_tier(self):
         """Free tier should have lowest limits"""
-        from security.auth import get_rate_limit
-        
         limits = get_rate_limit("free")
         
         assert limits["requests_per_minute"] <= 20
@@ -146,8 +502,6 @@ class TestRateLimits:
     @pytest.mark.unit
     def test_get_rate_limit_pro_tier(self):
         """Pro tier should have higher limits"""
-        from security.auth import get_rate_limit
-        
         limits = get_rate_limit("pro")
         
         assert limits["requests_per_minute"] >= 100
@@ -155,8 +509,6 @@ class TestRateLimits:
     @pytest.mark.unit
     def test_get_rate_limit_enterprise_tier(self):
         """Enterprise tier should have highest limits"""
-        from security.auth import get_rate_limit
-        
         limits = get_rate_limit("enterprise")
         
         assert limits["requests_per_minute"] >= 500
@@ -164,8 +516,6 @@ class TestRateLimits:
     @pytest.mark.unit
     def test_get_rate_limit_unknown_tier_defaults_to_free(self):
         """Unknown tier should default to free tier limits"""
-        from security.auth import get_rate_limit
-        
         free_limits = get_rate_limit("free")
         unknown_limits = get_rate_limit("unknown_tier")
         
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Unit Tests: Usage Quotas
+========================
+
+Tests for security/usage_quotas.py
+These tests verify quota accounting against a mocked Redis client.
+"""
+
+import pytest
+from unittest.mock import patch
+
+
+class TestUtcDay:
+    """Tests for the cached UTC day helper"""
+    
+    @pytest.mark.unit
+    def test_date_and_next_midnight(self):
+        """Should return the UTC date and the following midnight"""
+        from security.usage_quotas import utc_day
+        
+        # 2025-01-01T12:00:00Z
+        with patch("security.usage_quotas.time.time", return_value=1735732800.0):
+            today, midnight, reset_at = utc_day()
+        
+        assert today == "2025-01-01"
+        assert midnight == 1735776000
+        assert reset_at == "2025-01-02T00:00:00+00:00"
+    
+    @pytest.mark.unit
+    def test_rolls_over_at_midnight(self):
+        """A new UTC day should produce a new date string"""
+        from security.usage_quotas import utc_day
+        
+        with patch("security.usage_quotas.time.time", return_value=1735775999.0):
+            before, _, _ = utc_day()
+        with patch("security.usage_quotas.time.time", return_value=1735776000.0):
+            after, _, _ = utc_day()
+        
+        assert (before, after) == ("2025-01-01", "2025-01-02")
+
+
+class TestCheckQuota:
+    """Tests for quota checks"""
+    
+    @pytest.mark.unit
+    def test_reads_resource_field(self, mock_redis):
+        """Usage should come from the resource's field in the daily hash"""
+        from security import usage_quotas
+        from security.usage_quotas import UsageQuotaManager
+        
+        mock_redis.hget.return_value = "1000"
+        
+        with patch.object(usage_quotas, "redis_client", mock_redis), \
+             patch.object(usage_quotas, "REDIS_AVAILABLE", True):
+            allowed, info = UsageQuotaManager.check_quota("u1", "free", "requests")
+        
+        assert allowed is False
+        assert info["remaining"] == 0
+        assert mock_redis.hget.call_args.args[1] == "requests"
+
+
+class TestUsageSummary:
+    """Tests for the per-user usage summary"""
+    
+    @pytest.mark.unit
+    def test_single_read_for_all_resources(self, mock_redis):
+        """Summary should read every counter from one hash"""
+        from security import usage_quotas
+        from security.usage_quotas import UsageQuotaManager, DAILY_QUOTAS
+        
+        mock_redis.hgetall.return_value = {"requests": "500", "audio_minutes": "5"}
+        
+        with patch.object(usage_quotas, "redis_client", mock_redis), \
+             patch.object(usage_quotas, "REDIS_AVAILABLE", True):
+            summary = UsageQuotaManager.get_usage_summary("u1", "free")
+        
+        mock_redis.hgetall.assert_called_once()
+        assert mock_redis.hgetall.call_args.args[0].startswith("quota:u1:")
+        mock_redis.get.assert_not_called()
+        assert list(summary) == list(DAILY_QUOTAS["free"])
+        assert summary["requests"]["used"] == 500
+        assert summary["requests"]["percentage"] == 50.0
+        assert summary["compute_seconds"]["used"] == 0
+        assert summary["audio_minutes"]["remaining"] == 5
+
+
+class TestIncrementUsage:
+    """Tests for usage increments and threshold hooks"""
+    
+    @pytest.mark.unit
+    @pytest.mark.parametrize("reply,warned,exceeded", [
+        ([500, 0, 0], False, False),
+        ([800, 1, 0], True, False),
+        ([1000, 0, 1], False, True),
+    ])
+    def test_hooks_follow_script_flags(self, mock_redis, reply, warned, exceeded):
+        """Hooks should fire only when the script reports a crossing"""
+        from security import usage_quotas
+        from security.usage_quotas import UsageQuotaManager
+        
+        mock_redis.evalsha.return_value = reply
+        
+        with patch.object(usage_quotas, "redis_client", mock_redis), \
+             patch.object(usage_quotas, "REDIS_AVAILABLE", True), \
+             patch.object(UsageQuotaManager, "_send_quota_warning") as warn, \
+             patch.object(UsageQuotaManager, "_send_quota_exceeded") as exceed:
+            UsageQuotaManager.increment_usage("u1", "free", "requests", 1)
+        
+        assert warn.called is warned
+        assert exceed.called is exceeded
+        mock_redis.evalsha.assert_called_once()
+        args = mock_redis.evalsha.call_args.args
+        # sha, numkeys, key, resource, amount, quota, ttl
+        assert args[1] == 1
+        assert args[2].startswith("quota:u1:")
+        assert args[3:6] == ("requests", 1, 1000)
+        assert args[6] > 0
+    
+    @pytest.mark.unit
+    def test_no_hooks_while_over_threshold(self, mock_redis):
+        """Increments past a threshold that was already crossed stay silent"""
+        from security import usage_quotas
+        from security.usage_quotas import UsageQuotaManager
+        
+        mock_redis.evalsha.side_effect = [[800, 1, 0], [801, 0, 0], [1000, 0, 1], [1001, 0, 0]]
+        
+        with patch.object(usage_quotas, "redis_client", mock_redis), \
+             patch.object(usage_quotas, "REDIS_AVAILABLE", True), \
+             patch.object(UsageQuotaManager, "_send_quota_warning") as warn, \
+             patch.object(UsageQuotaManager, "_send_quota_exceeded") as exceed:
+            for _ in range(4):
+                UsageQuotaManager.increment_usage("u1", "free", "requests", 1)
+        
+        assert warn.call_count == 1
+        assert exceed.call_count == 1
@@ -8,13 +8,12 @@ These tests verify input sanitization and validation logic.
 """
 
 import pytest
-import sys
-import os
-
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from fastapi import HTTPException
-from security.input_validator import InputValidator
+from security.input_validator import MAX_TEXT_LENGTH, InputValidator
+
+# One character over the limit, built once at import
+_LONG_TEXT = "a" * (MAX_TEXT_LENGTH + 1)
 
 
 class TestTextValidation:
@@ -57,9 +56,8 @@ class TestTextValidation:
     @pytest.mark.unit
     def test_validate_text_too_long_rejected(self):
         """Text exceeding max length should raise 413 error"""
-        long_text = "a" * 200000  # Exceed 100k limit
         with pytest.raises(HTTPException) as exc:
-            InputValidator.validate_text(long_text)
+            InputValidator.validate_text(_LONG_TEXT)
         assert exc.value.status_code == 413
     
     @pytest.mark.unit